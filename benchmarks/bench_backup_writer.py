@@ -0,0 +1,131 @@
+"""Peak RSS and event-loop stall of the backup writers on a synthetic guild.
+
+    python benchmarks/bench_backup_writer.py --channels 10000
+
+Each writer runs in its own subprocess so peak RSS isn't shared between them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blackup.serialize import stream_backup
+
+
+def synthetic_sections(channels, overwrites):
+    """Lazily generated records shaped like a large community guild"""
+    def overwrite_list(seed):
+        return [
+            {"target_type": "role", "target_id": str(10**17 + seed * 31 + i), "allow": 1024, "deny": 2048}
+            for i in range(overwrites)
+        ]
+
+    def categories():
+        for i in range(channels // 50):
+            yield {"name": f"category-{i}", "id": str(10**18 + i), "position": i, "overwrites": overwrite_list(i)}
+
+    def text_channels():
+        for i in range(channels):
+            yield {
+                "name": f"channel-{i}",
+                "id": str(2 * 10**18 + i),
+                "type": "text",
+                "position": i,
+                "category_id": str(10**18 + i // 50),
+                "overwrites": overwrite_list(i),
+                "topic": "Synthetic channel topic " * 4,
+                "slowmode_delay": 0,
+                "nsfw": False
+            }
+
+    def roles():
+        for i in range(250):
+            yield {"name": f"role-{i}", "id": str(3 * 10**18 + i), "color": 0, "hoist": False,
+                   "mentionable": False, "permissions": 0, "position": i + 1}
+
+    return [("categories", categories()), ("channels", text_channels()), ("roles", roles()), ("emojis", iter(()))]
+
+
+SERVER_INFO = {"name": "Synthetic", "id": "1", "description": None, "owner_id": "2",
+               "verification_level": "low", "backup_date": "2026-01-01T00:00:00"}
+
+
+async def legacy_writer(filename, channels, overwrites):
+    backup_data = {"server_info": SERVER_INFO}
+    for name, records in synthetic_sections(channels, overwrites):
+        backup_data[name] = list(records)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(backup_data, f, indent=2, ensure_ascii=False)
+
+
+async def streaming_writer(filename, channels, overwrites):
+    await stream_backup(filename, SERVER_INFO, synthetic_sections(channels, overwrites))
+
+
+async def measure(writer, channels, overwrites):
+    max_stall = 0.0
+    stop = False
+
+    async def ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while not stop:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last - 0.001)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "backup.json")
+        start = time.perf_counter()
+        await writer(filename, channels, overwrites)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(filename)
+    stop = True
+    await tick
+    return elapsed, max_stall, size
+
+
+def run_child(mode, channels, overwrites):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    writer = legacy_writer if mode == "legacy" else streaming_writer
+    elapsed, stall, size = asyncio.run(measure(writer, channels, overwrites))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"elapsed": elapsed, "stall": stall, "size": size, "rss_kb": peak, "rss_growth_kb": peak - baseline}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=10000)
+    parser.add_argument("--overwrites", type=int, default=10)
+    parser.add_argument("--child", choices=["legacy", "streaming"])
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.channels, args.overwrites)
+        return
+
+    print(f"{args.channels} channels, {args.overwrites} overwrites each")
+    for mode in ("legacy", "streaming"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--channels", str(args.channels),
+             "--overwrites", str(args.overwrites)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(out)
+        print(f"{mode:<10} time={r['elapsed']:.2f}s  max_loop_stall={r['stall'] * 1000:.1f}ms  "
+              f"peak_rss={r['rss_kb'] / 1024:.1f}MB (+{r['rss_growth_kb'] / 1024:.1f}MB)  "
+              f"file={r['size'] / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Drive the backup engine end to end with no Discord connection.
+
+    python benchmarks/bench_engine.py --channels 400 --latency 0.02
+
+Stores a synthetic backup in a temporary LocalStorage, then times each
+engine step of restoring it onto a fake guild: cataloging, verifying,
+loading and planning, applying, and planning again on the restored guild.
+Then starts two restores of one guild at once, which must leave exactly
+one running and turn the other away before it touches the journal.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeGuild, synthetic_backup
+from blackup.capture import SECTIONS
+from blackup.engine import BackupEngine, RestoreInProgress
+from blackup.governor import Governor
+from blackup.integrity import atomic_write
+from blackup.journal import load_journal, restore_journal_path
+from blackup.storage import LocalStorage
+
+FILENAME = "synthetic_20260101_000000.json"
+
+
+async def timed(label, coro):
+    start = time.perf_counter()
+    result = await coro
+    print(f"{label:<22}{time.perf_counter() - start:8.3f}s")
+    return result
+
+
+async def concurrent_restores(engine, source, latency):
+    guild = FakeGuild(latency=latency)
+    path = engine.storage.path(guild.id, FILENAME)
+    os.makedirs(os.path.dirname(path))
+    shutil.copy(source, path)
+
+    async def restore():
+        job = await engine.plan_restore(guild, FILENAME)
+        return await engine.restore(job)
+
+    outcomes = await asyncio.gather(restore(), restore(), return_exceptions=True)
+    finished = [o for o in outcomes if not isinstance(o, BaseException)]
+    rejected = [o for o in outcomes if isinstance(o, RestoreInProgress)]
+    assert len(finished) == 1 and len(rejected) == 1, outcomes
+    assert not engine.restore_in_progress(guild.id)
+    # The journal holds the one restore that ran, start to finish
+    journal = load_journal(restore_journal_path(engine.storage.server_dir(guild.id)))
+    assert not journal.interrupted and len(journal.completed) == len(finished[0].scheduler.tasks)
+    # A third may go once the first is done, and has nothing left to create
+    again = await engine.plan_restore(guild, FILENAME, dry_run=True)
+    assert again.counts["create"] == 0, again.counts
+    print(f"concurrent restores: finished={len(finished)} rejected={len(rejected)} "
+          f"duplicates={len(guild.roles) - 1 - len(finished[0].backup_data['roles'])}")
+
+
+async def main(args):
+    backup_data = synthetic_backup(roles=args.roles, categories=args.categories, channels=args.channels)
+    with tempfile.TemporaryDirectory() as root:
+        # Rate limiting is measured separately in bench_restore.py and bench_governor.py
+        engine = BackupEngine(LocalStorage(root), governor=Governor(rate=1e9, burst=1e9))
+        guild = FakeGuild(latency=args.latency)
+
+        path = engine.storage.path(guild.id, FILENAME)
+        os.makedirs(os.path.dirname(path))
+        size = atomic_write(path, json.dumps(backup_data, indent=2).encode("utf-8"))
+        print(f"backup: {sum(len(backup_data[s]) for s in SECTIONS)} objects, {size:,} bytes")
+
+        count = await timed("count (catalog sync)", engine.count(guild.id))
+        dry = await timed("plan (dry run)", engine.plan_restore(guild, FILENAME, dry_run=True))
+        job = await timed("plan", engine.plan_restore(guild, FILENAME))
+        await timed("restore", engine.restore(job))
+        # Planning again diffs against a guild that now holds every object
+        await timed("re-plan", engine.plan_restore(guild, FILENAME, dry_run=True))
+
+        print(f"backups={count} planned={len(dry.scheduler.tasks)} applied={sum(job.applied.values())} "
+              f"errors={len(job.errors)} calls={guild.api_calls}")
+
+        # Two restores racing for one guild share its journal, so only one may run
+        await timed("concurrent restores", concurrent_restores(engine, path, args.latency))
+        engine.storage.catalog.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roles", type=int, default=250)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--channels", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+"""Size and load time of each backup format for a synthetic guild.
+
+    python benchmarks/bench_formats.py --channels 2000 --overwrites 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import synthetic_backup
+from blackup import compact
+from blackup.formats import load_backup
+
+
+def write_json(path, backup_data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(backup_data, f, indent=2, ensure_ascii=False)
+
+
+def timed_load(path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = load_backup(path)
+        best = min(best, time.perf_counter() - start)
+    return best, data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roles", type=int, default=250)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=2000)
+    parser.add_argument("--overwrites", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backup_data = synthetic_backup(args.roles, args.categories, args.channels, args.overwrites)
+    writers = [
+        ("json (legacy)", ".json", lambda path: write_json(path, backup_data)),
+        ("compact gzip", compact.EXTENSION, lambda path: compact.write_compact(path, backup_data, compact.GZIP)),
+    ]
+    if compact.zstandard is not None:
+        writers.append(("compact zstd", compact.EXTENSION, lambda path: compact.write_compact(path, backup_data, compact.ZSTD)))
+
+    print(f"{args.roles} roles, {args.categories} categories, {args.channels} channels, "
+          f"{args.overwrites} overwrites each")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for label, extension, write in writers:
+            path = os.path.join(tmp, "backup" + label.replace(" ", "_") + extension)
+            start = time.perf_counter()
+            write(path)
+            write_time = time.perf_counter() - start
+            size = os.path.getsize(path)
+            load_time, data = timed_load(path, args.repeat)
+            assert data == backup_data, f"{label} did not round-trip"
+            baseline = baseline or size
+            print(f"{label:<14} size={size / 1024:9.1f}KB ({size / baseline:6.1%})  "
+                  f"write={write_time * 1000:7.1f}ms  load={load_time * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
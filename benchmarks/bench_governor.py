@@ -0,0 +1,81 @@
+"""Run several restores and a background job against one rate-limited API.
+
+    python benchmarks/bench_governor.py --rate 50 --small 3
+
+Compares an effectively unlimited governor, where every job bursts into
+the shared limit, with one sized just under it. Reports 429s, throughput,
+and when each job finished next to the estimate it was given at start.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeGuild, FakeHTTP, synthetic_backup
+from blackup.governor import BACKGROUND, INTERACTIVE, Governor
+from blackup.planner import plan_changes
+from blackup.restore import RouteBuckets, schedule_plan
+
+
+async def restore_job(name, backup_data, http, governor, latency, delay):
+    await asyncio.sleep(delay)
+    guild = FakeGuild(latency=latency, http=http)
+    plan = plan_changes(guild, backup_data)
+    # Route buckets off, so the shared API limit is the only constraint
+    scheduler = schedule_plan(guild, plan, buckets=RouteBuckets({}), governor=governor, priority=INTERACTIVE)
+    estimate = governor.estimate(guild.id, len(scheduler.tasks), INTERACTIVE)
+    start = time.perf_counter()
+    _, errors, _ = await scheduler.run()
+    return name, len(scheduler.tasks), estimate, time.perf_counter() - start, len(errors)
+
+
+async def background_job(calls, http, governor, latency):
+    guild = FakeGuild(latency=latency, http=http)
+    estimate = governor.estimate(guild.id, calls, BACKGROUND)
+    start = time.perf_counter()
+    for _ in range(calls):
+        await governor.acquire(guild.id, BACKGROUND)
+        await guild._call()
+    return "background", calls, estimate, time.perf_counter() - start, 0
+
+
+async def run_once(label, governor, args, big, small):
+    http = FakeHTTP(rate=args.rate)
+    start = time.perf_counter()
+    jobs = [restore_job("big", big, http, governor, args.latency, 0)]
+    jobs += [
+        restore_job(f"small-{i}", small, http, governor, args.latency, args.stagger * (i + 1))
+        for i in range(args.small)
+    ]
+    jobs.append(background_job(args.background, http, governor, args.latency))
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{label}: total={elapsed:.2f}s requests={http.requests} 429s={http.rate_limited} "
+          f"throughput={http.requests / elapsed:.1f}/s")
+    for name, calls, estimate, took, errors in results:
+        print(f"  {name:<11} calls={calls:<5} estimate={estimate:6.2f}s took={took:6.2f}s errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=50, help="shared API limit, requests per second")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--small", type=int, default=3, help="small restores started after the big one")
+    parser.add_argument("--stagger", type=float, default=1.0)
+    parser.add_argument("--background", type=int, default=200, help="calls made by a background job")
+    args = parser.parse_args()
+
+    big = synthetic_backup(roles=150, categories=30, channels=400)
+    small = synthetic_backup(roles=10, categories=3, channels=20)
+    asyncio.run(run_once("ungoverned", Governor(rate=1e9, burst=1e9), args, big, small))
+    # Burst plus one second of refill has to fit inside the limit's window
+    governor = Governor(rate=args.rate * 0.8, burst=max(1, args.rate // 10))
+    asyncio.run(run_once("governed", governor, args, big, small))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare sequential and concurrent restores against a fake guild.
+
+    python benchmarks/bench_restore.py --latency 0.05 --channels 400
+    python benchmarks/bench_restore.py --route-limit 5 5
+
+Per-route limits are off by default, as in the bot, since discord.py
+paces each route from Discord's headers; --route-limit simulates a
+bucket of CALLS per SECONDS on every route to see how workers cope.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeGuild, synthetic_backup
+from blackup.governor import Governor
+from blackup.planner import plan_changes
+from blackup.restore import PHASES, RouteBuckets, count_applied, schedule_plan
+
+
+async def run_once(backup_data, workers, latency, limits):
+    guild = FakeGuild(latency=latency)
+    plan = plan_changes(guild, backup_data)
+    # The shared API budget is measured separately in bench_governor.py
+    governor = Governor(rate=1e9, burst=1e9)
+    scheduler = schedule_plan(guild, plan, workers=workers, buckets=RouteBuckets(limits), governor=governor)
+    start = time.perf_counter()
+    results, errors, timings = await scheduler.run()
+    elapsed = time.perf_counter() - start
+    applied = count_applied(plan, results)
+    phases = "  ".join(f"{phase}={timings.get(phase, 0):.2f}s" for phase in PHASES)
+    print(f"workers={workers:<3} total={elapsed:6.2f}s  {phases}  "
+          f"calls={guild.api_calls} max_in_flight={guild.max_in_flight} "
+          f"applied={sum(applied.values())} errors={len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roles", type=int, default=250)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--channels", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--route-limit", type=float, nargs=2, metavar=("CALLS", "SECONDS"),
+                        help="simulate a per-route bucket on roles, channels, emojis and members")
+    args = parser.parse_args()
+
+    backup_data = synthetic_backup(args.roles, args.categories, args.channels)
+    limits = None
+    if args.route_limit:
+        calls, per = args.route_limit
+        limits = {route: (calls, per) for route in ("roles", "channels", "emojis", "members")}
+    for workers in args.workers:
+        asyncio.run(run_once(backup_data, workers, args.latency, limits))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Connect sharded bots to a local fake gateway and check job routing and health.
+
+    python benchmarks/bench_shards.py --guilds 400 --shards 4 --processes 2
+
+Each simulated process is an AutoShardedBot with its own shard range, the
+way ``python -m blackup.sharding`` splits them. Every guild gets a job;
+jobs must be routed to the guild's shard, on the bot that owns it.
+One shard is then dropped to show jobs for it waiting until it resumes
+while other shards carry on.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+from benchmarks.fake_gateway import FakeGateway
+from blackup.sharding import SHARD_COUNT_ENV, SHARD_IDS_ENV, ShardWorkers, create_bot, shard_ranges
+
+
+async def no_identify_delay(shard_id, *, initial=False):
+    # The fake gateway has no identify rate limit to respect
+    return None
+
+
+async def start_bot(shard_count, shard_ids):
+    environ = {SHARD_COUNT_ENV: str(shard_count), SHARD_IDS_ENV: f"{shard_ids.start}-{shard_ids.stop - 1}"}
+    bot = create_bot(discord.Intents.default(), environ=environ, chunk_guilds_at_startup=False,
+                     guild_ready_timeout=0.2)
+    bot.before_identify_hook = no_identify_delay
+    task = asyncio.create_task(bot.start("fake-token"))
+    await asyncio.wait_for(bot.wait_until_ready(), 30)
+    return bot, ShardWorkers(bot, poll_interval=0.1), task
+
+
+def print_health(label, processes):
+    print(label)
+    for index, (_, workers, _) in enumerate(processes):
+        for shard in workers.health():
+            latency = "-" if shard["latency_ms"] is None else f"{shard['latency_ms']}ms"
+            print(f"  process={index} shard={shard['id']} {shard['status']:<12} latency={latency:<7} "
+                  f"guilds={shard['guilds']:<4} done={shard['completed']:<4} failed={shard['failed']}")
+
+
+async def main(args):
+    gateway = FakeGateway(guilds=args.guilds, shard_count=args.shards,
+                          heartbeat_interval=0.5, latency=args.latency)
+    await gateway.start()
+    gateway.patch()
+
+    start = time.perf_counter()
+    processes = [await start_bot(args.shards, ids) for ids in shard_ranges(args.shards, args.processes)]
+    print(f"{len(processes)} process(es), {args.shards} shards, {args.guilds} guilds "
+          f"ready in {time.perf_counter() - start:.2f}s ({gateway.identifies} identifies)")
+
+    owners = Counter()
+    misrouted = 0
+    for _, workers, _ in processes:
+        for guild in workers.bot.guilds:
+            owners[guild.id] += 1
+            if workers.shard_id(guild.id) != guild.shard_id or not workers.owns(guild.id):
+                misrouted += 1
+    print(f"guilds seen once={sum(1 for n in owners.values() if n == 1)} twice={sum(1 for n in owners.values() if n > 1)} "
+          f"missing={args.guilds - len(owners)} misrouted={misrouted}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        workers.run(guild.id, lambda: asyncio.sleep(args.job_time))
+        for _, workers, _ in processes for guild in workers.bot.guilds
+    ))
+    print(f"{args.guilds} jobs in {time.perf_counter() - start:.2f}s "
+          f"({args.job_time * 1000:.0f}ms each)")
+    await asyncio.sleep(1.5)
+    print_health("health after jobs:", processes)
+
+    # Drop the last shard; its job has to wait for the resume, jobs on other shards don't
+    dropped = args.shards - 1
+    bot, workers, _ = next(p for p in processes if dropped in p[0].shard_ids)
+    await gateway.drop(dropped, down_for=args.outage)
+    await asyncio.sleep(0.05)
+    print_health(f"health right after dropping shard {dropped}:", processes)
+    other = next(g for g in bot.guilds if g.shard_id != dropped) if len(bot.shard_ids) > 1 else None
+    target = next(g for g in bot.guilds if g.shard_id == dropped)
+
+    async def timed(guild):
+        begin = time.perf_counter()
+        await workers.run(guild.id, lambda: asyncio.sleep(args.job_time))
+        return time.perf_counter() - begin
+
+    timings = await asyncio.gather(timed(target), *([timed(other)] if other else []))
+    print(f"job on dropped shard took {timings[0]:.2f}s"
+          + (f", job on a live shard took {timings[1]:.2f}s" if other else "")
+          + f" (resumes={gateway.resumes})")
+
+    for bot, _, task in processes:
+        await bot.close()
+        await asyncio.gather(task, return_exceptions=True)
+    await gateway.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=400)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.02, help="heartbeat ACK delay in seconds")
+    parser.add_argument("--job-time", type=float, default=0.05)
+    parser.add_argument("--outage", type=float, default=2.0, help="seconds the dropped shard stays down")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    # discord.py logs every refused reconnect during the outage as an error
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    asyncio.run(main(args))
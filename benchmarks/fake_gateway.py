@@ -0,0 +1,203 @@
+"""Local stand-in for Discord's gateway, enough for discord.py to log in and shard.
+
+Serves the three REST calls made at login and a websocket that answers
+HELLO, IDENTIFY, RESUME and heartbeats, then sends READY and a
+GUILD_CREATE for every guild on the identifying shard.
+"""
+import asyncio
+import itertools
+import json
+
+import discord
+import yarl
+from aiohttp import WSMsgType, web
+
+from blackup.sharding import shard_for
+
+APPLICATION_ID = "1380815457992441917"
+USER = {
+    "id": APPLICATION_ID,
+    "username": "blackup",
+    "discriminator": "0",
+    "global_name": "Blackup",
+    "avatar": None,
+    "bot": True,
+    "flags": 0
+}
+
+
+def _json(data):
+    # discord.py only parses bodies whose content-type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+
+
+class FakeGateway:
+    def __init__(self, guilds=100, shard_count=4, heartbeat_interval=1.0, latency=0.0, host="127.0.0.1", port=0):
+        self.shard_count = shard_count
+        self.heartbeat_interval = heartbeat_interval
+        self.latency = latency
+        self.host = host
+        self.port = port
+        # Snowflakes spread evenly across shards, like real guild IDs
+        self.guilds = [((i + 1) << 22) | i for i in range(guilds)]
+        self.sockets = {}
+        self.sessions = {}
+        # Loop time before which new gateway connections are refused
+        self.down_until = 0.0
+        self.identifies = 0
+        self.resumes = 0
+        self._session_ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.router.add_get("/api/v10/users/@me", self.me)
+        self.app.router.add_get("/api/v10/gateway/bot", self.gateway_bot)
+        self.app.router.add_get("/api/v10/oauth2/applications/@me", self.application)
+        self.app.router.add_get("/gateway", self.websocket)
+        self.runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.port}/gateway"
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for ws in list(self.sockets.values()):
+            await ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def patch(self):
+        """Point discord.py's REST base and default gateway at this server"""
+        discord.http.Route.BASE = f"{self.url}/api/v10"
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(self.ws_url)
+
+    def shard_guilds(self, shard_id, shard_count):
+        return [guild_id for guild_id in self.guilds if shard_for(guild_id, shard_count) == shard_id]
+
+    async def drop(self, shard_id, down_for=0.0):
+        """Close a shard's socket and refuse reconnects for ``down_for`` seconds.
+
+        Shards that are already connected keep their sockets.
+        """
+        self.down_until = asyncio.get_running_loop().time() + down_for
+        ws = self.sockets.pop(shard_id, None)
+        if ws is not None:
+            await ws.close(code=4000)
+
+    async def me(self, request):
+        return _json(USER)
+
+    async def gateway_bot(self, request):
+        return _json({
+            "url": self.ws_url,
+            "shards": self.shard_count,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 16}
+        })
+
+    async def application(self, request):
+        return _json({
+            "id": APPLICATION_ID,
+            "name": "Blackup",
+            "description": "",
+            "icon": None,
+            "bot_public": True,
+            "bot_require_code_grant": False,
+            "owner": USER,
+            "verify_key": "0" * 64,
+            "flags": 0
+        })
+
+    def _guild(self, guild_id):
+        return {
+            "id": str(guild_id),
+            "name": f"Guild {guild_id >> 22}",
+            "owner_id": USER["id"],
+            "member_count": 1,
+            "large": False,
+            "unavailable": False,
+            "features": [],
+            "roles": [{
+                "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+                "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0
+            }],
+            "channels": [],
+            "emojis": [],
+            "stickers": [],
+            "members": [],
+            "threads": [],
+            "voice_states": [],
+            "presences": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "premium_tier": 0,
+            "verification_level": 0,
+            "explicit_content_filter": 0,
+            "default_message_notifications": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0
+        }
+
+    async def _dispatch(self, ws, state, event, data):
+        state["seq"] += 1
+        await ws.send_str(json.dumps({"op": 0, "t": event, "s": state["seq"], "d": data}))
+
+    async def websocket(self, request):
+        if asyncio.get_running_loop().time() < self.down_until:
+            raise web.HTTPServiceUnavailable()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": int(self.heartbeat_interval * 1000)}}))
+        state = {"seq": 0, "shard": None}
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                op = payload["op"]
+                if op == 1:
+                    await asyncio.sleep(self.latency)
+                    if ws.closed:
+                        break
+                    await ws.send_str(json.dumps({"op": 11}))
+                elif op == 2:
+                    shard_id, shard_count = payload["d"].get("shard", [0, 1])
+                    self.identifies += 1
+                    session_id = f"session-{next(self._session_ids)}"
+                    state["shard"] = (shard_id, shard_count)
+                    self.sessions[session_id] = state
+                    self.sockets[shard_id] = ws
+                    guilds = self.shard_guilds(shard_id, shard_count)
+                    await self._dispatch(ws, state, "READY", {
+                        "v": 10,
+                        "user": USER,
+                        "guilds": [{"id": str(guild_id), "unavailable": True} for guild_id in guilds],
+                        "session_id": session_id,
+                        "resume_gateway_url": self.ws_url,
+                        "shard": [shard_id, shard_count],
+                        "application": {"id": APPLICATION_ID, "flags": 0}
+                    })
+                    for guild_id in guilds:
+                        await self._dispatch(ws, state, "GUILD_CREATE", self._guild(guild_id))
+                elif op == 6:
+                    previous = self.sessions.get(payload["d"]["session_id"])
+                    if previous is None:
+                        # Invalid session, not resumable
+                        await ws.send_str(json.dumps({"op": 9, "d": False}))
+                        continue
+                    self.resumes += 1
+                    state = previous
+                    self.sockets[state["shard"][0]] = ws
+                    await self._dispatch(ws, state, "RESUMED", {})
+        finally:
+            if state["shard"] is not None and self.sockets.get(state["shard"][0]) is ws:
+                del self.sockets[state["shard"][0]]
+        return ws
@@ -0,0 +1,285 @@
+"""Local stand-ins for a Discord guild, used by the benchmark scripts"""
+import asyncio
+import itertools
+import random
+from collections import deque
+
+_ids = itertools.count(10**17)
+
+
+class FakeObject:
+    def __init__(self, **fields):
+        self.id = next(_ids)
+        self.overwrites = {}
+        self.managed = False
+        self.__dict__.update(fields)
+
+    def is_default(self):
+        return False
+
+    def is_assignable(self):
+        return True
+
+    async def edit(self, **fields):
+        await self.guild._call()
+        self.__dict__.update(fields)
+
+    async def delete(self):
+        await self.guild._call()
+
+
+class FakeHTTP:
+    """Shared API stand-in with a global rate limit.
+
+    Requests past ``rate`` per ``per`` seconds get a 429, counted and then
+    retried after the advertised delay the way discord.py does.
+    """
+
+    def __init__(self, rate=50, per=1.0):
+        self.rate = rate
+        self.per = per
+        self.calls = deque()
+        self.requests = 0
+        self.rate_limited = 0
+        self.by_guild = {}
+
+    async def request(self, guild_id):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self.calls and now - self.calls[0] >= self.per:
+                self.calls.popleft()
+            if len(self.calls) < self.rate:
+                self.calls.append(now)
+                self.requests += 1
+                self.by_guild[guild_id] = self.by_guild.get(guild_id, 0) + 1
+                return
+            self.rate_limited += 1
+            await asyncio.sleep(self.per - (now - self.calls[0]))
+
+
+class FakeState:
+    """Just enough of discord.py's connection state for raw bulk endpoints"""
+
+    def __init__(self, guild):
+        self.http = self
+        self.guild = guild
+
+    async def bulk_channel_update(self, guild_id, data, reason=None):
+        await self.guild._call()
+        by_id = {channel.id: channel for channel in self.guild.channels}
+        for entry in data:
+            by_id[entry["id"]].position = entry["position"]
+
+
+class FakeGuild:
+    """Guild whose mutating calls sleep for an injected latency"""
+
+    def __init__(self, latency=0.05, jitter=0.0, http=None):
+        self.id = next(_ids)
+        self.name = "Fake Guild"
+        self.latency = latency
+        self.jitter = jitter
+        self.default_role = FakeObject(name="@everyone", guild=self)
+        self.default_role.is_default = lambda: True
+        self.roles = [self.default_role]
+        self.categories = []
+        self.text_channels = []
+        self.voice_channels = []
+        self.emojis = []
+        self.members = {}
+        self.me = None
+        self._state = FakeState(self)
+        self.http = http
+        self.api_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def channels(self):
+        return self.categories + self.text_channels + self.voice_channels
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    async def _call(self):
+        if self.http is not None:
+            await self.http.request(self.id)
+        self.api_calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        finally:
+            self.in_flight -= 1
+
+    async def create_role(self, **fields):
+        await self._call()
+        role = FakeObject(**fields, guild=self)
+        self.roles.append(role)
+        return role
+
+    async def create_category(self, name, **fields):
+        await self._call()
+        category = FakeObject(name=name, **fields, guild=self)
+        self.categories.append(category)
+        return category
+
+    async def create_text_channel(self, name, **fields):
+        await self._call()
+        fields.setdefault("type", "text")
+        channel = FakeObject(name=name, **fields, guild=self)
+        self.text_channels.append(channel)
+        return channel
+
+    async def create_voice_channel(self, name, **fields):
+        await self._call()
+        fields.setdefault("type", "voice")
+        channel = FakeObject(name=name, **fields, guild=self)
+        self.voice_channels.append(channel)
+        return channel
+
+    async def create_stage_channel(self, name, **fields):
+        return await self.create_voice_channel(name, type="stage_voice", **fields)
+
+    async def create_forum(self, name, **fields):
+        return await self.create_text_channel(name, type="forum", **fields)
+
+    async def edit_role_positions(self, positions, reason=None):
+        await self._call()
+        for role, position in positions.items():
+            role.position = position
+
+    async def create_custom_emoji(self, name, image):
+        await self._call()
+        emoji = FakeObject(name=name, image=image, guild=self)
+        self.emojis.append(emoji)
+        return emoji
+
+
+def synthetic_backup(roles=250, categories=40, channels=400, overwrites=10):
+    """Backup dict in the /load-backup format with made-up IDs"""
+    role_ids = [str(next(_ids)) for _ in range(roles)]
+    category_ids = [str(next(_ids)) for _ in range(categories)]
+
+    def make_overwrites():
+        return [
+            {
+                "target_type": "role",
+                "target_id": random.choice(role_ids),
+                "allow": 1024,
+                "deny": 2048
+            }
+            for _ in range(overwrites)
+        ]
+
+    return {
+        "server_info": {"name": "Synthetic", "id": str(next(_ids))},
+        "roles": [
+            {
+                "name": f"role-{i}",
+                "id": role_id,
+                "color": 0,
+                "hoist": False,
+                "mentionable": False,
+                "permissions": 0,
+                "position": i + 1
+            }
+            for i, role_id in enumerate(role_ids)
+        ],
+        "categories": [
+            {
+                "name": f"category-{i}",
+                "id": category_id,
+                "position": i,
+                "overwrites": make_overwrites()
+            }
+            for i, category_id in enumerate(category_ids)
+        ],
+        "channels": [
+            {
+                "name": f"channel-{i}",
+                "id": str(next(_ids)),
+                "type": "voice" if i % 5 == 0 else "text",
+                "position": i,
+                "category_id": random.choice(category_ids) if category_ids else None,
+                "overwrites": make_overwrites()
+            }
+            for i in range(channels)
+        ],
+        "emojis": []
+    }
+
+
+class FakeGuildMember:
+    """Member with roles, for member role snapshots and restores"""
+
+    def __init__(self, guild, roles):
+        self.id = next(_ids)
+        self.guild = guild
+        self.display_name = f"member-{self.id}"
+        self.roles = [guild.default_role] + list(roles)
+
+    async def add_roles(self, *roles, reason=None, atomic=True):
+        await self.guild._call()
+        self.roles += [role for role in roles if role not in self.roles]
+
+
+class FakeMember:
+    def __init__(self, name):
+        self.id = next(_ids)
+        self.display_name = name
+
+
+class FakeIcon:
+    def __init__(self, guild_id):
+        self.url = f"https://cdn.discordapp.com/icons/{guild_id}/a1b2c3d4.png"
+
+    def with_size(self, size):
+        icon = FakeIcon.__new__(FakeIcon)
+        icon.url = f"{self.url}?size={size}"
+        return icon
+
+
+class FakeDashboardGuild:
+    """Read-only guild with the attributes the dashboard renders"""
+
+    def __init__(self, index, channels=50, members=500):
+        self.id = next(_ids)
+        self.name = f"Community {index}"
+        self.description = "A synthetic community used for dashboard load tests." if index % 3 else None
+        self.owner = FakeMember(f"owner-{index}")
+        self.icon = FakeIcon(self.id) if index % 4 else None
+        self.member_count = members
+        self.channels = [object()] * channels
+        # FakeBot isn't sharded, so every guild is on shard 0
+        self.shard_id = 0
+
+
+class FakeBot:
+    def __init__(self, guilds=1000):
+        self.guilds = [FakeDashboardGuild(i) for i in range(guilds)]
+        self.ready = True
+        self.listeners = {}
+        # A single, unsharded connection, as ShardWorkers.health reports it
+        self.shard_count = None
+        self.latency = 0.042
+
+    def add_listener(self, func, name):
+        self.listeners.setdefault(name, []).append(func)
+
+    async def dispatch(self, event, *args):
+        for func in self.listeners.get(f"on_{event}", []):
+            await func(*args)
+
+    def is_ready(self):
+        return self.ready
+
+    def is_closed(self):
+        return False
+
+    def is_ws_ratelimited(self):
+        return False
+
+    def get_guild(self, guild_id):
+        return next((g for g in self.guilds if g.id == guild_id), None)
@@ -0,0 +1,110 @@
+"""Load test the web dashboard with a fake bot holding many guilds.
+
+    python benchmarks/loadtest_dashboard.py --guilds 1000 --concurrency 50 --duration 10
+
+Page size is reported as sent over the wire for the given --encoding, and
+TTFB is the time until response headers arrive. While requests run, a background task keeps adding and removing guilds to
+mimic gateway traffic on the same event loop.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeBot, FakeDashboardGuild
+from blackup.dashboard import Dashboard
+
+TEMPLATES = os.path.join(ROOT, "CÓ DASHBOARD", "templates")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def churn(bot, stop):
+    while not stop.is_set():
+        if random.random() < 0.5 and bot.guilds:
+            guild = bot.guilds.pop(random.randrange(len(bot.guilds)))
+            await bot.dispatch("guild_remove", guild)
+        else:
+            guild = FakeDashboardGuild(len(bot.guilds))
+            bot.guilds.append(guild)
+            await bot.dispatch("guild_join", guild)
+        await asyncio.sleep(0.001)
+
+
+async def client(session, url, headers, deadline, latencies, ttfbs, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as response:
+                ttfbs.append(time.perf_counter() - start)
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+        except aiohttp.ClientError as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(args):
+    bot = FakeBot(args.guilds)
+    dashboard = Dashboard(bot, TEMPLATES, host="127.0.0.1", port=args.port)
+    await dashboard.start()
+
+    stop = asyncio.Event()
+    churner = asyncio.create_task(churn(bot, stop))
+    latencies = []
+    ttfbs = []
+    errors = []
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    headers = {"Accept-Encoding": args.encoding}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    # Leave bodies compressed so the reported size is what crossed the wire
+    async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+        async with session.get(url, headers=headers) as response:
+            body = await response.read()
+            page_bytes = len(body)
+            encoding = response.headers.get("Content-Encoding", "identity")
+        async with session.get(url, headers={"Accept-Encoding": "identity"}) as response:
+            images = (await response.text()).count("<img")
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            client(session, url, headers, deadline, latencies, ttfbs, errors) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    stop.set()
+    await churner
+    await dashboard.stop()
+
+    print(f"{args.guilds} guilds, {args.concurrency} concurrent clients, {args.duration}s on {args.path}")
+    print(f"requests={len(latencies)}  errors={len(errors)}  page={page_bytes / 1024:.1f}KB ({encoding})  images={images}")
+    print(f"throughput={len(latencies) / elapsed:.1f} req/s  "
+          f"p50={percentile(latencies, 50) * 1000:.1f}ms  p99={percentile(latencies, 99) * 1000:.1f}ms  "
+          f"ttfb p50={percentile(ttfbs, 50) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--encoding", default="gzip, deflate, br")
+    args = parser.parse_args()
+
+    # Keep the catalog database out of the working tree
+    os.chdir(tempfile.mkdtemp())
+    asyncio.run(main(args))
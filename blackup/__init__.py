@@ -0,0 +1 @@
+"""Backup and restore helpers shared by the Blackup bots"""
@@ -0,0 +1,5 @@
+import sys
+
+from blackup.cli import main
+
+sys.exit(main())
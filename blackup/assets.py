@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import os
+
+import aiohttp
+
+ASSET_DIR = "backups/assets"
+
+
+class GuildAssets:
+    """Digests of one guild's downloaded assets, keyed the way capture needs them"""
+
+    def __init__(self):
+        self.icon = None
+        self.banner = None
+        self.emojis = {}
+        self.stickers = []
+        self.downloaded = 0
+
+
+class AssetStore:
+    """Content-addressed image store shared by every guild.
+
+    Emoji, sticker, icon and banner bytes live once under
+    ``blobs/<hash[:2]>/<hash>`` however many snapshots or guilds use them.
+    CDN URLs already fetched are remembered in ``index.json``, so a backup
+    only downloads assets it hasn't seen before. Downloads share one
+    aiohttp session and run ``concurrency`` at a time.
+    """
+
+    def __init__(self, root=ASSET_DIR, concurrency=8):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.concurrency = concurrency
+        self.index = None
+        self.session = None
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def read(self, digest):
+        with open(self.blob_path(digest), "rb") as f:
+            return f.read()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_index(self, snapshot):
+        os.makedirs(self.root, exist_ok=True)
+        # Shard processes share the store, so temp names are per process
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.index_path)
+
+    def _write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    async def _ensure_ready(self):
+        if self.index is None:
+            self.index = await asyncio.get_running_loop().run_in_executor(None, self._load_index)
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+
+    async def fetch(self, url):
+        """Digest of the asset at url, downloading it only the first time"""
+        await self._ensure_ready()
+        digest = self.index.get(url)
+        if digest is not None:
+            return digest, False
+
+        async with self.semaphore:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    raise ValueError(f"{url} returned HTTP {response.status}")
+                data = await response.read()
+        digest = await asyncio.get_running_loop().run_in_executor(None, self._write_blob, data)
+        self.index[url] = digest
+        return digest, True
+
+    async def fetch_many(self, urls):
+        """Fetch urls concurrently; returns {url: digest} for the ones that succeeded"""
+        await self._ensure_ready()
+
+        async def one(url):
+            try:
+                return url, await self.fetch(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Could not download asset {url}: {e}")
+                return url, (None, False)
+
+        results = await asyncio.gather(*(one(url) for url in set(urls)))
+        digests = {url: digest for url, (digest, _) in results if digest is not None}
+        downloaded = sum(new for _, (_, new) in results)
+        if downloaded:
+            await asyncio.get_running_loop().run_in_executor(None, self._save_index, dict(self.index))
+        return digests, downloaded
+
+    async def fetch_guild(self, guild):
+        """Download a guild's icon, banner, emojis and stickers"""
+        icon = str(guild.icon.url) if guild.icon else None
+        banner = str(guild.banner.url) if guild.banner else None
+        emojis = {str(emoji.id): str(emoji.url) for emoji in guild.emojis}
+        stickers = list(guild.stickers)
+        urls = [url for url in (icon, banner) if url]
+        urls += emojis.values()
+        urls += [str(sticker.url) for sticker in stickers]
+
+        digests, downloaded = await self.fetch_many(urls)
+        assets = GuildAssets()
+        assets.icon = digests.get(icon)
+        assets.banner = digests.get(banner)
+        assets.emojis = {emoji_id: digests.get(url) for emoji_id, url in emojis.items()}
+        assets.stickers = [
+            {
+                "name": sticker.name,
+                "id": str(sticker.id),
+                "description": sticker.description,
+                "emoji": sticker.emoji,
+                "format": sticker.format.name,
+                "asset": digests.get(str(sticker.url))
+            }
+            for sticker in stickers
+        ]
+        assets.downloaded = downloaded
+        return assets
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+_store = None
+
+
+def get_asset_store():
+    global _store
+    if _store is None:
+        _store = AssetStore()
+    return _store
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+from blackup.assets import get_asset_store
+from blackup.capture import SECTIONS, capture_guild, iter_sections, server_info
+from blackup.compact import write_compact
+from blackup.events import get_event_bus
+from blackup.members import MemberRoles, write_member_snapshot
+from blackup.metrics import BACKUP_BYTES, BACKUP_DURATION, BACKUPS
+from blackup.serialize import stream_backup
+from blackup.snapshots import get_store
+from blackup.storage import get_storage
+
+FORMATS = ("json", "incremental", "compact")
+
+
+class BackupResult:
+    def __init__(self, filename, counts, new_objects=None):
+        self.filename = filename
+        self.counts = counts
+        self.new_objects = new_objects
+        self.new_assets = 0
+        self.members = None
+        self.entry = None
+
+
+async def _write_backup(guild, storage, filename, backup_format):
+    loop = asyncio.get_running_loop()
+    # Image bytes go to the shared asset store; the backup keeps their digests
+    assets = await get_asset_store().fetch_guild(guild)
+
+    if backup_format == "incremental":
+        # Only records that changed since the last snapshot hit the disk
+        backup_data = capture_guild(guild, assets)
+        counts = {section: len(backup_data[section]) for section in SECTIONS}
+        new_objects = await loop.run_in_executor(
+            None, get_store(storage.server_dir(guild.id)).write_manifest, filename, backup_data
+        )
+        result = BackupResult(filename, counts, new_objects)
+    elif backup_format == "compact":
+        # Columnar and compressed; encoding happens off the event loop
+        backup_data = capture_guild(guild, assets)
+        counts = {section: len(backup_data[section]) for section in SECTIONS}
+        await loop.run_in_executor(None, write_compact, filename, backup_data)
+        result = BackupResult(filename, counts)
+    else:
+        # Sections are written as they are walked, off the event loop
+        counts, _ = await stream_backup(filename, server_info(guild, assets), iter_sections(guild, assets))
+        result = BackupResult(filename, counts)
+
+    result.new_assets = assets.downloaded
+
+    # Keep the catalog in step so listings never have to walk the directory
+    result.entry = await loop.run_in_executor(
+        None, storage.catalog.record, guild.id, filename, counts, backup_format
+    )
+    return result
+
+
+async def _write_member_roles(guild, filename, result):
+    if not guild.chunked:
+        await guild.chunk()
+    snapshot = await MemberRoles.capture(guild)
+    await asyncio.get_running_loop().run_in_executor(None, write_member_snapshot, filename, snapshot)
+    result.members = len(snapshot)
+
+
+async def create_backup(guild, backup_name=None, backup_format="json", include_members=False, storage=None):
+    """Back up a guild to a new file in its backup directory.
+
+    With ``include_members``, which members hold which roles is saved
+    alongside it.
+    """
+    storage = storage or get_storage()
+    filename = storage.new_path(guild, backup_name, backup_format)
+    events = get_event_bus()
+    event = {"guild_id": str(guild.id), "filename": os.path.basename(filename), "format": backup_format}
+    events.publish("backup_started", **event)
+    start = time.monotonic()
+
+    try:
+        result = await _write_backup(guild, storage, filename, backup_format)
+        if include_members:
+            await _write_member_roles(guild, filename, result)
+    except Exception as e:
+        BACKUPS.inc(format=backup_format, outcome="failed")
+        events.publish("backup_failed", error=str(e), **event)
+        raise
+
+    duration = time.monotonic() - start
+    BACKUPS.inc(format=backup_format, outcome="ok")
+    BACKUP_DURATION.observe(duration, format=backup_format)
+    BACKUP_BYTES.observe(result.entry.size, format=backup_format)
+    events.publish("backup_finished", size=result.entry.size, duration=duration, **event)
+    return result
@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import discord
+
+SECTIONS = ("categories", "channels", "roles", "emojis")
+
+
+def overwrite_records(overwrites):
+    return [
+        {
+            # Targets discord.py can't resolve come back as discord.Object with a type
+            "target_type": "role" if isinstance(target, discord.Role) or getattr(target, "type", None) is discord.Role else "member",
+            "target_id": str(target.id),
+            "allow": overwrite.pair()[0].value,
+            "deny": overwrite.pair()[1].value
+        }
+        for target, overwrite in overwrites.items()
+    ]
+
+
+def server_info(guild, assets=None):
+    info = {
+        "name": guild.name,
+        "id": str(guild.id),
+        "description": guild.description,
+        "owner_id": str(guild.owner_id),
+        "verification_level": str(guild.verification_level),
+        "backup_date": datetime.now().isoformat()
+    }
+    # Digests of images saved in the asset store
+    if assets is not None:
+        info.update({
+            "icon_asset": assets.icon,
+            "banner_asset": assets.banner,
+            "stickers": assets.stickers
+        })
+    return info
+
+
+def category_record(category):
+    return {
+        "name": category.name,
+        "id": str(category.id),
+        "position": category.position,
+        "overwrites": overwrite_records(category.overwrites)
+    }
+
+
+def channel_record(channel):
+    channel_data = {
+        "name": channel.name,
+        "id": str(channel.id),
+        "type": str(channel.type),
+        "position": channel.position,
+        "category_id": str(channel.category.id) if channel.category else None,
+        "overwrites": overwrite_records(channel.overwrites)
+    }
+
+    # Add specific data based on channel type (text also covers announcement channels)
+    if isinstance(channel, (discord.TextChannel, discord.ForumChannel)):
+        channel_data.update({
+            "topic": channel.topic,
+            "slowmode_delay": channel.slowmode_delay,
+            "nsfw": channel.nsfw
+        })
+    if isinstance(channel, discord.ForumChannel):
+        channel_data.update({
+            "default_thread_slowmode_delay": channel.default_thread_slowmode_delay,
+            "default_auto_archive_duration": channel.default_auto_archive_duration,
+            "available_tags": [forum_tag_record(tag) for tag in channel.available_tags]
+        })
+    elif isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+        channel_data.update({
+            "bitrate": channel.bitrate,
+            "user_limit": channel.user_limit,
+            "rtc_region": channel.rtc_region
+        })
+        if isinstance(channel, discord.StageChannel):
+            channel_data["topic"] = channel.topic
+    return channel_data
+
+
+def forum_tag_record(tag):
+    return {
+        "name": tag.name,
+        "emoji": str(tag.emoji) if tag.emoji else None,
+        "moderated": tag.moderated
+    }
+
+
+def role_record(role):
+    return {
+        "name": role.name,
+        "id": str(role.id),
+        "color": role.color.value,
+        "hoist": role.hoist,
+        "mentionable": role.mentionable,
+        "permissions": role.permissions.value,
+        "position": role.position,
+        "managed": role.managed
+    }
+
+
+def emoji_record(emoji, assets=None):
+    record = {
+        "name": emoji.name,
+        "id": str(emoji.id),
+        "animated": emoji.animated,
+        "url": str(emoji.url)
+    }
+    if assets is not None:
+        record["asset"] = assets.emojis.get(str(emoji.id))
+    return record
+
+
+def iter_section(guild, section, assets=None):
+    """Yield the backup records for one section of the guild"""
+    if section == "categories":
+        for category in guild.categories:
+            yield category_record(category)
+    elif section == "channels":
+        for channel in guild.channels:
+            if not isinstance(channel, discord.CategoryChannel):
+                yield channel_record(channel)
+    elif section == "roles":
+        for role in guild.roles:
+            if role.name != "@everyone":
+                yield role_record(role)
+    elif section == "emojis":
+        for emoji in guild.emojis:
+            yield emoji_record(emoji, assets)
+
+
+def iter_sections(guild, assets=None):
+    """Yield (section, records) pairs, walking each section lazily"""
+    for section in SECTIONS:
+        yield section, iter_section(guild, section, assets)
+
+
+def capture_guild(guild, assets=None):
+    """Snapshot the guild structure into a backup dict"""
+    backup_data = {"server_info": server_info(guild, assets)}
+    for section in SECTIONS:
+        backup_data[section] = list(iter_section(guild, section, assets))
+    return backup_data
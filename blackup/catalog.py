@@ -0,0 +1,259 @@
+import bisect
+import hashlib
+import os
+import sqlite3
+import threading
+
+from blackup.capture import SECTIONS
+from blackup.formats import backup_time, detect_format, list_backup_files, load_backup
+from blackup.integrity import IntegrityError, read_trailer, verify_backup
+
+CATALOG_FILE = "backups/catalog.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    guild_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    categories INTEGER NOT NULL DEFAULT 0,
+    channels INTEGER NOT NULL DEFAULT 0,
+    roles INTEGER NOT NULL DEFAULT 0,
+    emojis INTEGER NOT NULL DEFAULT 0,
+    checksum TEXT NOT NULL,
+    PRIMARY KEY (guild_id, filename)
+);
+CREATE INDEX IF NOT EXISTS backups_by_time ON backups (guild_id, created_at DESC);
+CREATE TABLE IF NOT EXISTS synced_guilds (guild_id TEXT PRIMARY KEY);
+"""
+
+_COLUMNS = ("guild_id", "filename", "created_at", "size", "format",
+            "categories", "channels", "roles", "emojis", "checksum")
+
+
+def file_checksum(path):
+    """SHA-256 of a backup's contents, straight from its trailer when it has one"""
+    trailer = read_trailer(path)
+    if trailer is not None:
+        return trailer.digest
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CatalogEntry:
+    def __init__(self, row):
+        for column, value in zip(_COLUMNS, row):
+            setattr(self, column, value)
+
+    @property
+    def counts(self):
+        return {
+            "categories": self.categories,
+            "channels": self.channels,
+            "roles": self.roles,
+            "emojis": self.emojis
+        }
+
+
+class BackupCatalog:
+    """Per-guild index of backup files kept in one SQLite database.
+
+    Every write and delete of a backup updates the catalog, so listing,
+    paging and dashboard totals never have to walk the backup directories.
+    Safe to call from executor threads.
+    """
+
+    def __init__(self, path=CATALOG_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def _changed(self, guild_id):
+        for listener in self.listeners:
+            listener(str(guild_id))
+
+    def record(self, guild_id, path, counts, backup_format, created_at=None):
+        """Add or refresh the entry for a backup file that was just written"""
+        if created_at is None:
+            created_at = backup_time(path).timestamp()
+        row = (
+            str(guild_id), os.path.basename(path), created_at, os.path.getsize(path), backup_format,
+            counts.get("categories", 0), counts.get("channels", 0),
+            counts.get("roles", 0), counts.get("emojis", 0),
+            file_checksum(path)
+        )
+        with self.lock, self.db:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO backups ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                row
+            )
+        self._changed(guild_id)
+        return CatalogEntry(row)
+
+    def verify(self, guild_id, path):
+        """verify_backup, falling back to the checksum recorded when the file was cataloged"""
+        entry = self.get(guild_id, os.path.basename(path))
+        return verify_backup(path, entry.checksum if entry else None)
+
+    def remove(self, guild_id, filenames):
+        with self.lock, self.db:
+            self.db.executemany(
+                "DELETE FROM backups WHERE guild_id = ? AND filename = ?",
+                [(str(guild_id), os.path.basename(name)) for name in filenames]
+            )
+        self._changed(guild_id)
+
+    def remove_guild(self, guild_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM backups WHERE guild_id = ?", (str(guild_id),))
+        self._changed(guild_id)
+
+    def get(self, guild_id, filename):
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM backups WHERE guild_id = ? AND filename = ?",
+                (str(guild_id), filename)
+            ).fetchone()
+        return CatalogEntry(row) if row else None
+
+    def list(self, guild_id, limit=None, offset=0):
+        """Backups for a guild, newest first"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM backups WHERE guild_id = ? "
+                "ORDER BY created_at DESC, filename DESC LIMIT ? OFFSET ?",
+                (str(guild_id), -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [CatalogEntry(row) for row in rows]
+
+    def count(self, guild_id):
+        with self.lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM backups WHERE guild_id = ?", (str(guild_id),)
+            ).fetchone()[0]
+
+    def totals(self):
+        """Backup count and bytes per guild, in one query"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT guild_id, COUNT(*), SUM(size) FROM backups GROUP BY guild_id"
+            ).fetchall()
+        return {guild_id: (count, size) for guild_id, count, size in rows}
+
+    def sync(self, guild_id, server_dir):
+        """Index files written before the catalog existed. Runs once per guild."""
+        guild_id = str(guild_id)
+        with self.lock:
+            if self.db.execute("SELECT 1 FROM synced_guilds WHERE guild_id = ?", (guild_id,)).fetchone():
+                return 0
+
+        known = {entry.filename for entry in self.list(guild_id)}
+        added = 0
+        for name in list_backup_files(server_dir):
+            if name in known:
+                continue
+            path = os.path.join(server_dir, name)
+            try:
+                # Damaged files fail their checksum before any parsing
+                backup_data = load_backup(path)
+            except IntegrityError as e:
+                print(f"Skipping damaged backup {path}: {e}")
+                continue
+            except Exception as e:
+                print(f"Skipping unreadable backup {path}: {e}")
+                continue
+            counts = {section: len(backup_data.get(section, [])) for section in SECTIONS}
+            self.record(guild_id, path, counts, detect_format(path))
+            added += 1
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR IGNORE INTO synced_guilds VALUES (?)", (guild_id,))
+        return added
+
+
+class NameCache:
+    """In-memory, prefix-searchable backup names per guild.
+
+    Autocomplete has to answer within Discord's 3 second deadline, so names
+    are kept sorted in memory and searched with bisect. A guild's entry is
+    dropped whenever the catalog changes for it and reloaded on next use.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.guilds = {}
+        self.lock = threading.Lock()
+        catalog.listeners.append(self.invalidate)
+
+    def invalidate(self, guild_id):
+        with self.lock:
+            self.guilds.pop(str(guild_id), None)
+
+    def _load(self, guild_id):
+        guild_id = str(guild_id)
+        with self.lock:
+            cached = self.guilds.get(guild_id)
+        if cached is None:
+            newest = [entry.filename for entry in self.catalog.list(guild_id)]
+            keys = sorted((name.lower(), name) for name in newest)
+            cached = (newest, [key for key, _ in keys], [name for _, name in keys])
+            with self.lock:
+                self.guilds[guild_id] = cached
+        return cached
+
+    def search(self, guild_id, prefix, limit=25):
+        """Newest names when prefix is empty, else prefix then substring matches"""
+        newest, keys, names = self._load(guild_id)
+        prefix = prefix.lower()
+        if not prefix:
+            return newest[:limit]
+
+        matches = []
+        start = bisect.bisect_left(keys, prefix)
+        for i in range(start, len(keys)):
+            if not keys[i].startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(names[i])
+        if len(matches) < limit:
+            seen = set(matches)
+            for name in newest:
+                if prefix in name.lower() and name not in seen:
+                    matches.append(name)
+                    if len(matches) >= limit:
+                        break
+        return matches
+
+
+def sync_all(catalog, root):
+    """Index every guild directory under root that hasn't been synced yet"""
+    if not os.path.isdir(root):
+        return 0
+    return sum(
+        catalog.sync(name, os.path.join(root, name))
+        for name in os.listdir(root)
+        if name.isdigit() and os.path.isdir(os.path.join(root, name))
+    )
+
+
+_catalog = None
+_names = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = BackupCatalog()
+    return _catalog
+
+
+def get_name_cache():
+    global _names
+    if _names is None:
+        _names = NameCache(get_catalog())
+    return _names
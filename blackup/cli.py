@@ -0,0 +1,353 @@
+"""Offline tools for backup files; no bot or Discord connection needed.
+
+    python -m blackup list [GUILD_ID]
+    python -m blackup stats BACKUP
+    python -m blackup diff OLD NEW
+    python -m blackup convert BACKUP OUTPUT [--format compact]
+    python -m blackup validate [PATH ...] [--workers 8]
+
+BACKUP is a file path, or GUILD_ID/FILENAME under --root. Add --json to
+any command for machine-readable output. --root and --json go before or
+after the command. convert records an output written into a guild
+directory under --root in that root's catalog, so the bots list it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from blackup.backups import FORMATS
+from blackup.capture import SECTIONS
+from blackup.compact import EXTENSION as COMPACT_EXTENSION
+from blackup.formats import backup_time, detect_format, is_backup_file, list_backup_files, load_backup, schema_problems, write_backup
+from blackup.integrity import IntegrityError, read_trailer, verify_backup
+from blackup.members import member_snapshot_path
+from blackup.storage import BACKUP_ROOT, LocalStorage
+
+
+class InvalidBackup(ValueError):
+    """A backup parsed, but isn't shaped like one"""
+
+
+def load_valid(path):
+    """load_backup, raising InvalidBackup instead of returning a dict the commands can't read"""
+    try:
+        backup_data = load_backup(path)
+    except (IntegrityError, OSError):
+        raise
+    except Exception as e:
+        # Malformed JSON, bad UTF-8, a damaged compact body without a trailer...
+        raise InvalidBackup(f"{path} can't be read: {e}") from e
+    problems = schema_problems(backup_data, limit=3)
+    if problems:
+        raise InvalidBackup(f"{path} is not a valid backup: {'; '.join(problems)}")
+    return backup_data
+
+
+def resolve_path(root, name):
+    if os.path.exists(name):
+        return name
+    path = os.path.join(root, name)
+    if os.path.exists(path):
+        return path
+    raise FileNotFoundError(f"no backup at {name} or {path}")
+
+
+def _guild_dirs(path):
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.isdigit() and os.path.isdir(os.path.join(path, name))
+    )
+
+
+def backup_paths(path):
+    """Backup files under a file, a guild directory or a root of guild directories"""
+    if os.path.isfile(path):
+        return [path]
+    guild_dirs = _guild_dirs(path)
+    if guild_dirs:
+        # A root also holds schedules.json and the like, which aren't backups
+        return [file for guild_dir in guild_dirs for file in backup_paths(guild_dir)]
+    return sorted(os.path.join(path, name) for name in list_backup_files(path))
+
+
+def list_guilds(root):
+    guilds = []
+    for guild_dir in _guild_dirs(root) if os.path.isdir(root) else []:
+        paths = backup_paths(guild_dir)
+        guilds.append({
+            "guild_id": os.path.basename(guild_dir),
+            "backups": len(paths),
+            "bytes": sum(os.path.getsize(path) for path in paths),
+            "newest": max((backup_time(path) for path in paths), default=None)
+        })
+    return guilds
+
+
+def list_backups(root, guild_id):
+    entries = [
+        {
+            "filename": os.path.basename(path),
+            "format": detect_format(path),
+            "bytes": os.path.getsize(path),
+            "taken_at": backup_time(path)
+        }
+        for path in backup_paths(os.path.join(root, str(guild_id)))
+    ]
+    entries.sort(key=lambda entry: (entry["taken_at"], entry["filename"]), reverse=True)
+    return entries
+
+
+def backup_stats(path):
+    backup_data = load_valid(path)
+    trailer = read_trailer(path)
+    info = backup_data["server_info"]
+    return {
+        "file": path,
+        "format": detect_format(path),
+        "bytes": os.path.getsize(path),
+        "schema": trailer.schema if trailer else None,
+        "sha256": trailer.digest if trailer else None,
+        "server": info.get("name"),
+        "server_id": info.get("id"),
+        "taken_at": info.get("backup_date"),
+        "counts": {section: len(backup_data[section]) for section in SECTIONS},
+        "channel_types": dict(Counter(channel.get("type") for channel in backup_data["channels"])),
+        "overwrites": sum(
+            len(record.get("overwrites", [])) for section in ("categories", "channels") for record in backup_data[section]
+        ),
+        "stickers": len(info.get("stickers") or []),
+        "member_roles": os.path.exists(member_snapshot_path(path))
+    }
+
+
+def _diff_section(old_records, new_records):
+    old = {record["id"]: record for record in old_records}
+    new = {record["id"]: record for record in new_records}
+    changed = []
+    for record_id, record in new.items():
+        before = old.get(record_id)
+        if before is not None and before != record:
+            fields = sorted(field for field in set(before) | set(record) if before.get(field) != record.get(field))
+            changed.append({"name": record["name"], "fields": fields})
+    return {
+        "added": [record["name"] for record_id, record in new.items() if record_id not in old],
+        "removed": [record["name"] for record_id, record in old.items() if record_id not in new],
+        "changed": changed
+    }
+
+
+def diff_backups(old_path, new_path):
+    """Objects added, removed and changed between two backups, matched by ID"""
+    old, new = load_valid(old_path), load_valid(new_path)
+    return {section: _diff_section(old[section], new[section]) for section in SECTIONS}
+
+
+def convert_backup(source, output, backup_format=None):
+    if backup_format is None:
+        backup_format = "compact" if output.endswith(COMPACT_EXTENSION) else "json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    backup_data = load_valid(source)
+    write_backup(output, backup_data, backup_format)
+    return {
+        "source": source,
+        "output": output,
+        "format": backup_format,
+        "bytes_before": os.path.getsize(source),
+        "bytes_after": os.path.getsize(output),
+        "counts": {section: len(backup_data[section]) for section in SECTIONS}
+    }
+
+
+def output_guild(root, output):
+    """Guild ID when output is a backup file directly inside a guild directory under root"""
+    guild_dir = os.path.dirname(os.path.abspath(output))
+    guild_id = os.path.basename(guild_dir)
+    if (guild_id.isdigit() and is_backup_file(os.path.basename(output))
+            and os.path.dirname(guild_dir) == os.path.abspath(root)):
+        return guild_id
+    return None
+
+
+def validate_file(path):
+    """Checksum, then parse, then schema; returns (path, problems). Runs in a worker process."""
+    try:
+        verify_backup(path)
+    except (IntegrityError, OSError) as e:
+        return path, [str(e)]
+    try:
+        backup_data = load_backup(path)
+    except Exception as e:
+        return path, [f"can't be read: {e}"]
+    return path, schema_problems(backup_data)
+
+
+def validate_backups(paths, workers=None):
+    """validate_file over many files at once; parsing is CPU-bound, so one process per core"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [validate_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Batches keep per-file IPC small next to the work of parsing
+        chunksize = max(1, len(paths) // (workers * 4))
+        return list(pool.map(validate_file, paths, chunksize=chunksize))
+
+
+def _size(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def _print_json(result):
+    print(json.dumps(result, indent=2, default=str, ensure_ascii=False))
+
+
+def cmd_list(args):
+    if args.guild_id is None:
+        result = list_guilds(args.root)
+        if args.json:
+            return _print_json(result)
+        if not result:
+            print(f"No guild backups under {args.root}/")
+        for guild in result:
+            newest = guild["newest"].strftime("%Y-%m-%d %H:%M") if guild["newest"] else "-"
+            print(f"{guild['guild_id']:<20} {guild['backups']:>5} backup(s) {_size(guild['bytes']):>10}  newest {newest}")
+        return 0
+
+    result = list_backups(args.root, args.guild_id)
+    if args.json:
+        return _print_json(result)
+    if not result:
+        print(f"No backups for guild {args.guild_id}")
+    for entry in result:
+        print(f"{entry['taken_at']:%Y-%m-%d %H:%M:%S}  {entry['format']:<11} {_size(entry['bytes']):>10}  {entry['filename']}")
+    return 0
+
+
+def cmd_stats(args):
+    result = backup_stats(resolve_path(args.root, args.backup))
+    if args.json:
+        return _print_json(result)
+    print(f"{result['file']}")
+    print(f"  Server:     {result['server']} ({result['server_id']})")
+    print(f"  Taken:      {result['taken_at'] or '-'}")
+    print(f"  Format:     {result['format']}, {_size(result['bytes'])}"
+          + (f", schema {result['schema']}, checksummed" if result["schema"] is not None else ", no checksum trailer"))
+    for section in SECTIONS:
+        print(f"  {section.title() + ':':<11} {result['counts'][section]}")
+    if result["channel_types"]:
+        print("  Channel types: " + ", ".join(f"{kind} {count}" for kind, count in sorted(result["channel_types"].items())))
+    print(f"  Overwrites: {result['overwrites']}")
+    print(f"  Stickers:   {result['stickers']}")
+    print(f"  Member roles saved: {'yes' if result['member_roles'] else 'no'}")
+    return 0
+
+
+def cmd_diff(args):
+    result = diff_backups(resolve_path(args.root, args.old), resolve_path(args.root, args.new))
+    if args.json:
+        return _print_json(result)
+    unchanged = True
+    for section in SECTIONS:
+        diff = result[section]
+        for name in diff["added"]:
+            print(f"+ {section[:-1]} {name}")
+        for name in diff["removed"]:
+            print(f"- {section[:-1]} {name}")
+        for change in diff["changed"]:
+            print(f"~ {section[:-1]} {change['name']}: {', '.join(change['fields'])}")
+        unchanged = unchanged and not any(diff.values())
+    if unchanged:
+        print("No differences")
+    return 0
+
+
+def cmd_convert(args):
+    source = resolve_path(args.root, args.backup)
+    if os.path.exists(args.output) and not args.force:
+        print(f"{args.output} already exists; pass --force to replace it", file=sys.stderr)
+        return 1
+    result = convert_backup(source, args.output, args.format)
+    # The catalog only scans a guild directory once, so it would never see this file otherwise
+    guild_id = output_guild(args.root, args.output)
+    if guild_id is not None:
+        storage = LocalStorage(args.root)
+        storage.catalog.record(guild_id, args.output, result["counts"], detect_format(args.output))
+    result["cataloged"] = guild_id is not None
+    if args.json:
+        return _print_json(result)
+    print(f"Wrote {result['output']} ({result['format']}, {_size(result['bytes_before'])} -> {_size(result['bytes_after'])})"
+          + (f", added to guild {guild_id}'s catalog" if guild_id is not None else ""))
+    return 0
+
+
+def cmd_validate(args):
+    paths = [path for target in (args.paths or [args.root]) for path in backup_paths(target)]
+    start = time.perf_counter()
+    results = validate_backups(paths, args.workers)
+    elapsed = time.perf_counter() - start
+    invalid = {path: problems for path, problems in results if problems}
+    if args.json:
+        _print_json({"checked": len(paths), "seconds": round(elapsed, 3), "invalid": invalid})
+    else:
+        for path, problems in invalid.items():
+            print(f"✗ {path}")
+            for problem in problems[:5]:
+                print(f"    {problem}")
+            if len(problems) > 5:
+                print(f"    ... and {len(problems) - 5} more")
+        print(f"Checked {len(paths)} backup(s) in {elapsed:.2f}s: {len(paths) - len(invalid)} valid, {len(invalid)} invalid")
+    return 1 if invalid else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m blackup", description="Inspect, compare, convert and validate backups offline")
+    parser.add_argument("--root", default=BACKUP_ROOT, help=f"backup directory (default: {BACKUP_ROOT})")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    # The same options after the command; SUPPRESS keeps them from resetting ones given before it
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--root", default=argparse.SUPPRESS, help=f"backup directory (default: {BACKUP_ROOT})")
+    common.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="print results as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", parents=[common], help="guilds with backups, or one guild's backups")
+    list_parser.add_argument("guild_id", nargs="?")
+    list_parser.set_defaults(func=cmd_list)
+
+    stats_parser = commands.add_parser("stats", parents=[common], help="what a backup contains")
+    stats_parser.add_argument("backup")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    diff_parser = commands.add_parser("diff", parents=[common], help="objects added, removed and changed between two backups")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.set_defaults(func=cmd_diff)
+
+    convert_parser = commands.add_parser("convert", parents=[common], help="rewrite a backup in another format")
+    convert_parser.add_argument("backup")
+    convert_parser.add_argument("output")
+    convert_parser.add_argument("--format", choices=FORMATS, help="default: from the output extension")
+    convert_parser.add_argument("--force", action="store_true", help="replace an existing output file")
+    convert_parser.set_defaults(func=cmd_convert)
+
+    validate_parser = commands.add_parser("validate", parents=[common], help="check checksums and schemas in parallel")
+    validate_parser.add_argument("paths", nargs="*", help="files or directories (default: --root)")
+    validate_parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    validate_parser.set_defaults(func=cmd_validate)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args) or 0
+    except (FileNotFoundError, IntegrityError, InvalidBackup) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # Piped into head or similar; stop quietly and keep the exit flush from failing too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
@@ -0,0 +1,635 @@
+"""Slash commands shared by both bots; they only differ in what they serve on the web"""
+import asyncio
+from datetime import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from blackup.catalog import sync_all
+from blackup.engine import BackupEngine, NoMemberRoles, RestoreInProgress
+from blackup.governor import INTERACTIVE, get_governor
+from blackup.integrity import IntegrityError
+from blackup.messages import export_in_progress, export_messages, replay_messages
+from blackup.metrics import watch_discord_rate_limits
+from blackup.planner import KINDS
+from blackup.restore import PHASES, count_member_updates
+from blackup.retention import RetentionEngine, RetentionPolicy
+from blackup.schedule import BackupSchedule, BackupScheduler
+from blackup.sharding import ShardWorkers
+from blackup.views import BackupListView, backup_list_embed
+
+BACKUP_FORMAT_CHOICES = [
+    app_commands.Choice(name="Full JSON", value="json"),
+    app_commands.Choice(name="Incremental snapshot", value="incremental"),
+    app_commands.Choice(name="Compact (compressed)", value="compact")
+]
+
+
+async def report_restore_progress(interaction, scheduler, interval=3.0):
+    """Keep the deferred response updated with how far a restore has got"""
+    total = len(scheduler.tasks)
+    while True:
+        done = scheduler.completed
+        if scheduler.started is None:
+            content = f"⏳ Waiting for this server's shard to reconnect before applying {total} changes"
+        else:
+            if done >= 5:
+                # Route limits dominate once running, so extrapolate from the pace so far
+                left = (scheduler.clock() - scheduler.started) / done * (total - done)
+            else:
+                left = get_governor().estimate(interaction.guild.id, total - done, INTERACTIVE)
+            content = f"🔄 Restoring: {done}/{total} changes ({done * 100 // max(total, 1)}%), about {left:.0f}s left"
+        try:
+            await interaction.edit_original_response(content=content)
+        except discord.HTTPException:
+            pass
+        await asyncio.sleep(interval)
+
+
+class BlackupCog(commands.Cog):
+    """Backup, schedule, retention and restore commands on top of a BackupEngine"""
+
+    def __init__(self, bot, shard_workers=None, storage=None):
+        self.bot = bot
+        # discord.py only logs its 429 retries; count them in blackup_rate_limit_wait_seconds
+        watch_discord_rate_limits()
+        # Backups and restores wait for the shard that owns the guild to be connected
+        self.shard_workers = shard_workers or ShardWorkers(bot)
+        self.engine = BackupEngine(storage, run=self.shard_workers.run)
+        self.storage = self.engine.storage
+        # Schedules, policies and the catalog all live with the storage
+        self.backup_scheduler = BackupScheduler(
+            self.run_scheduled_backup, self.storage.schedules_file, owns=self.shard_workers.owns
+        )
+        self.retention_engine = RetentionEngine(
+            self.storage.retention_file, owns=self.shard_workers.owns, catalog=self.storage.catalog
+        )
+        # Long-running jobs such as message replays; kept so they aren't garbage collected
+        self.background_tasks = set()
+
+    async def run_scheduled_backup(self, guild_id, backup_format):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        await self.engine.backup(guild, "auto", backup_format)
+        await self.retention_engine.apply(guild_id, self.storage.server_dir(guild_id))
+
+    async def backup_filename_autocomplete(self, interaction: discord.Interaction, current: str):
+        # Served from memory so it answers well inside the autocomplete deadline
+        names = self.storage.names.search(interaction.guild.id, current)
+        # Choice names and values are capped at 100 characters
+        return [app_commands.Choice(name=name, value=name) for name in names if len(name) <= 100]
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        bot = self.bot
+        if bot.shard_count:
+            print(f'Running shard(s) {", ".join(map(str, bot.shard_ids or range(bot.shard_count)))} of {bot.shard_count}')
+
+        # Commands are global, so only the process running shard 0 syncs them
+        if 0 in (bot.shard_ids or [0]):
+            try:
+                synced = await bot.tree.sync()
+                print(f'Synced {len(synced)} command(s)')
+            except Exception as e:
+                print(f'Failed to sync commands: {e}')
+
+        try:
+            self.backup_scheduler.start()
+            print(f'Backup scheduler running for {len(self.backup_scheduler.schedules)} server(s)')
+        except Exception as e:
+            print(f'Failed to start backup scheduler: {e}')
+
+        try:
+            self.retention_engine.start(self.storage.server_dir)
+        except Exception as e:
+            print(f'Failed to start retention: {e}')
+
+        try:
+            # Index backups written before the catalog existed
+            await asyncio.get_running_loop().run_in_executor(None, sync_all, self.storage.catalog, self.storage.root)
+        except Exception as e:
+            print(f'Failed to index existing backups: {e}')
+
+    @app_commands.command(name="load-backup", description="Create a backup of the server")
+    @app_commands.describe(
+        backup_name="Name for the backup file (optional)",
+        backup_format="Full JSON file, an incremental snapshot, or a compressed compact file",
+        include_members="Also save which members have which roles"
+    )
+    @app_commands.choices(backup_format=BACKUP_FORMAT_CHOICES)
+    async def backup_server(self, interaction: discord.Interaction, backup_name: str = None, backup_format: app_commands.Choice[str] = None, include_members: bool = False):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        guild = interaction.guild
+
+        # Save backup to file
+        try:
+            result = await self.engine.backup(
+                guild, backup_name, backup_format.value if backup_format else "json", include_members
+            )
+
+            # Create embed for success message
+            embed = discord.Embed(
+                title="✅ Server Backup Complete!",
+                description=f"Successfully backed up **{guild.name}**",
+                color=discord.Color.green(),
+                timestamp=datetime.now()
+            )
+
+            embed.add_field(
+                name="📊 Backup Stats",
+                value=f"**Categories:** {result.counts['categories']}\n"
+                      f"**Channels:** {result.counts['channels']}\n"
+                      f"**Roles:** {result.counts['roles']}\n"
+                      f"**Emojis:** {result.counts['emojis']}",
+                inline=False
+            )
+
+            embed.add_field(
+                name="📁 File",
+                value=f"`{result.filename}`",
+                inline=False
+            )
+
+            if result.new_objects is not None:
+                embed.add_field(
+                    name="🧩 Snapshot",
+                    value=f"**New objects stored:** {result.new_objects}",
+                    inline=False
+                )
+
+            if result.new_assets:
+                embed.add_field(
+                    name="🖼️ Assets",
+                    value=f"**New images downloaded:** {result.new_assets}",
+                    inline=False
+                )
+
+            if result.members is not None:
+                embed.add_field(
+                    name="👥 Member Roles",
+                    value=f"**Members saved:** {result.members:,}",
+                    inline=False
+                )
+
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            error_embed = discord.Embed(
+                title="❌ Backup Failed",
+                description=f"An error occurred while creating the backup: {str(e)}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=error_embed)
+
+    @app_commands.command(name="export-messages", description="Back up message history (resumes where the last export stopped)")
+    @app_commands.describe(
+        channel="Only export this channel (default: every channel the bot can read)"
+    )
+    async def export_server_messages(self, interaction: discord.Interaction, channel: discord.TextChannel = None):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        if export_in_progress(interaction.guild.id):
+            await interaction.response.send_message("⏳ A message export is already running for this server.", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        try:
+            report = await export_messages(
+                interaction.guild,
+                self.storage.server_dir(interaction.guild.id),
+                channels=[channel] if channel else None
+            )
+
+            embed = discord.Embed(
+                title="💬 Message Export Complete!",
+                description="New messages were appended to this server's message backup",
+                color=discord.Color.green(),
+                timestamp=datetime.now()
+            )
+
+            embed.add_field(
+                name="📊 Export Summary",
+                value=f"**Channels:** {report.channels}\n"
+                      f"**New Messages:** {report.messages:,}\n"
+                      f"**Written:** {report.bytes:,} bytes",
+                inline=False
+            )
+
+            if report.skipped:
+                embed.add_field(
+                    name="🔒 Skipped (no access)",
+                    value=", ".join(f"#{name}" for name in report.skipped[:20]),
+                    inline=False
+                )
+
+            if report.errors:
+                embed.add_field(
+                    name="⚠️ Errors",
+                    value=f"```{chr(10).join(report.errors[:5])}```\nRun the command again to resume.",
+                    inline=False
+                )
+
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            error_embed = discord.Embed(
+                title="❌ Message Export Failed",
+                description=f"An error occurred while exporting messages: {str(e)}\nRun the command again to resume.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=error_embed)
+
+    @app_commands.command(name="backup-schedule", description="Schedule automatic backups of the server")
+    @app_commands.describe(
+        interval_hours="Take a backup every N hours",
+        cron="Cron expression instead of an interval, e.g. '0 3 * * *' for 03:00 daily",
+        backup_format="Format for scheduled backups (defaults to incremental snapshots)",
+        disable="Turn scheduled backups off for this server"
+    )
+    @app_commands.choices(backup_format=BACKUP_FORMAT_CHOICES)
+    async def schedule_backups(self, interaction: discord.Interaction, interval_hours: float = None, cron: str = None, backup_format: app_commands.Choice[str] = None, disable: bool = False):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        backup_scheduler = self.backup_scheduler
+        if disable:
+            if backup_scheduler.remove(interaction.guild.id):
+                await interaction.response.send_message("⏹️ Scheduled backups disabled for this server.")
+            else:
+                await interaction.response.send_message("📁 This server has no backup schedule.", ephemeral=True)
+            return
+
+        if interval_hours is None and cron is None:
+            schedule = backup_scheduler.get(interaction.guild.id)
+            title = "⏰ Backup Schedule"
+        else:
+            try:
+                schedule = backup_scheduler.set(BackupSchedule(
+                    interaction.guild.id,
+                    interval=interval_hours * 3600 if interval_hours is not None else None,
+                    cron=cron,
+                    backup_format=backup_format.value if backup_format else "incremental"
+                ))
+            except ValueError as e:
+                await interaction.response.send_message(f"❌ Invalid schedule: {str(e)}", ephemeral=True)
+                return
+            title = "⏰ Backup Schedule Updated"
+
+        if schedule is None:
+            await interaction.response.send_message("📁 This server has no backup schedule. Set one with `interval_hours` or `cron`.", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title=title,
+            description=f"Backing up **{interaction.guild.name}** {schedule.describe()}",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+
+        embed.add_field(
+            name="📋 Schedule",
+            value=f"**Format:** {schedule.backup_format}\n"
+                  f"**Next Run:** {f'<t:{int(schedule.next_run)}:R>' if schedule.next_run else 'Running now'}\n"
+                  f"**Last Duration:** {f'{schedule.last_duration:.1f}s' if schedule.last_duration is not None else 'Never run'}",
+            inline=False
+        )
+
+        stats = backup_scheduler.stats()
+        embed.add_field(
+            name="📊 Scheduler",
+            value=f"**Scheduled Servers:** {stats['scheduled']}\n"
+                  f"**Queue Depth:** {stats['queue_depth']}\n"
+                  f"**Last Lag:** {stats['last_lag']:.1f}s",
+            inline=False
+        )
+
+        embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="backup-retention", description="Automatically thin out old backups")
+    @app_commands.describe(
+        keep_last="Always keep this many of the newest backups",
+        hourly="Also keep the newest backup from each of the last N hours",
+        daily="Also keep the newest backup from each of the last N days",
+        weekly="Also keep the newest backup from each of the last N weeks",
+        max_mb="Delete the oldest backups once the server uses more than this many MB",
+        archive="Fold old backups into one compressed archive per month instead of deleting them",
+        disable="Turn retention off for this server"
+    )
+    async def backup_retention(self, interaction: discord.Interaction, keep_last: int = None, hourly: int = 0, daily: int = 0, weekly: int = 0, max_mb: float = None, archive: bool = False, disable: bool = False):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        retention_engine = self.retention_engine
+        guild_id = interaction.guild.id
+        if disable:
+            if retention_engine.remove(guild_id):
+                await interaction.response.send_message("⏹️ Backup retention disabled for this server.")
+            else:
+                await interaction.response.send_message("📁 This server has no retention policy.", ephemeral=True)
+            return
+
+        if keep_last is None:
+            policy = retention_engine.get(guild_id)
+            if policy is None:
+                await interaction.response.send_message("📁 This server has no retention policy. Set one with `keep_last`.", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"🧹 Retention policy: {policy.describe()}")
+            return
+
+        try:
+            policy = RetentionPolicy(
+                keep_last=keep_last,
+                hourly=hourly,
+                daily=daily,
+                weekly=weekly,
+                max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+                archive=archive
+            )
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ Invalid retention policy: {str(e)}", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        try:
+            retention_engine.set(guild_id, policy)
+            report = await retention_engine.apply(guild_id, self.storage.server_dir(guild_id))
+
+            embed = discord.Embed(
+                title="🧹 Retention Policy Applied",
+                description=f"Keeping {policy.describe()}",
+                color=discord.Color.orange(),
+                timestamp=datetime.now()
+            )
+
+            embed.add_field(
+                name="📊 Cleanup Summary",
+                value=f"**Deleted:** {report.deleted}\n"
+                      f"**Archived:** {report.archived}\n"
+                      f"**Reclaimed:** {report.reclaimed_bytes:,} bytes",
+                inline=False
+            )
+
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            error_embed = discord.Embed(
+                title="❌ Retention Failed",
+                description=f"An error occurred while applying the retention policy: {str(e)}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=error_embed)
+
+    @app_commands.command(name="list-backups", description="List all available server backups")
+    async def list_backups(self, interaction: discord.Interaction):
+        if not self.storage.has_guild(interaction.guild.id):
+            await interaction.response.send_message("📁 No backups found for this server.", ephemeral=True)
+            return
+
+        # Answered from the catalog instead of listing and stat-ing every file
+        total = await self.engine.count(interaction.guild.id)
+
+        if not total:
+            await interaction.response.send_message("📁 No backup files found.", ephemeral=True)
+            return
+
+        # Pages of the full set, newest first
+        catalog = self.storage.catalog
+        embed, page, pages = backup_list_embed(interaction.guild.id, 0, catalog)
+        if pages > 1:
+            view = BackupListView(interaction.guild.id, page, pages, catalog)
+            await interaction.response.send_message(embed=embed, view=view)
+            view.message = await interaction.original_response()
+        else:
+            await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="reset-file", description="Remove all backup files")
+    async def reset_backup_files(self, interaction: discord.Interaction):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        # Check if server backup directory exists
+        if not self.storage.has_guild(interaction.guild.id):
+            await interaction.followup.send("📁 No backups found for this server - nothing to delete.")
+            return
+
+        try:
+            if not self.storage.list(interaction.guild.id):
+                await interaction.followup.send("📁 No backup files found - nothing to delete.")
+                return
+
+            # Delete all backup files for this server
+            deleted_count = await self.engine.reset(interaction.guild.id)
+
+            # Create success embed
+            embed = discord.Embed(
+                title="🗑️ Backup Files Deleted!",
+                description=f"Successfully deleted {deleted_count} backup file(s)",
+                color=discord.Color.orange(),
+                timestamp=datetime.now()
+            )
+
+            embed.add_field(
+                name="📊 Deletion Summary",
+                value=f"**Files Deleted:** {deleted_count}\n**Directory:** `{self.storage.root}/`",
+                inline=False
+            )
+
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            error_embed = discord.Embed(
+                title="❌ Deletion Failed",
+                description=f"An error occurred while deleting backup files: {str(e)}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=error_embed)
+
+    @app_commands.command(name="blackup", description="Restore server from a backup file")
+    @app_commands.describe(
+        backup_filename="Name of the backup file to restore from",
+        dry_run="Only show the changes a restore would make",
+        prune="Also delete roles and channels that aren't in the backup",
+        replay="Re-post exported messages into channels the restore recreates",
+        member_roles="Give members back the roles they had when the backup was taken"
+    )
+    @app_commands.autocomplete(backup_filename=backup_filename_autocomplete)
+    async def restore_server(self, interaction: discord.Interaction, backup_filename: str, dry_run: bool = False, prune: bool = False, replay: bool = False, member_roles: bool = False):
+        # Check if user has administrator permissions
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permissions to use this command!", ephemeral=True)
+            return
+
+        if not dry_run and self.engine.restore_in_progress(interaction.guild.id):
+            await interaction.response.send_message("⏳ A restore is already running for this server.", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        # Check if backup file exists in server directory
+        if not self.storage.exists(interaction.guild.id, backup_filename):
+            await interaction.followup.send("❌ Backup file not found! Use `/list-backups` to see available backups for this server.")
+            return
+
+        try:
+            guild = interaction.guild
+
+            # Checked against its checksum before parsing, and resumed if a restore of it was interrupted
+            try:
+                job = await self.engine.plan_restore(guild, backup_filename, prune, member_roles, dry_run)
+            except IntegrityError as e:
+                await interaction.followup.send(f"❌ This backup is damaged and can't be restored: {str(e)}")
+                return
+            except NoMemberRoles:
+                await interaction.followup.send("❌ This backup has no member roles. Create one with `/load-backup include_members:True`.")
+                return
+            except RestoreInProgress:
+                await interaction.followup.send("⏳ A restore is already running for this server.")
+                return
+
+            plan, counts, scheduler = job.plan, job.counts, job.scheduler
+
+            if dry_run or not scheduler.tasks:
+                embed = discord.Embed(
+                    title="🧾 Restore Plan" if scheduler.tasks else "✅ Server Already Matches Backup",
+                    description=f"Changes needed to restore from `{backup_filename}`",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.now()
+                )
+
+                planned = [f"**{kind.title()}:** {counts[kind]}" for kind in KINDS]
+                if plan.reorder:
+                    planned.append(f"**Reorder:** {', '.join(sorted(plan.reorder))} (one bulk update each)")
+                if job.member_roles is not None:
+                    planned.append(f"**Members To Update:** {job.member_updates}")
+                if job.resuming:
+                    planned.append(f"**Already Done:** {job.already_done} (resuming an interrupted restore)")
+                embed.add_field(
+                    name="📊 Planned Changes",
+                    value="\n".join(planned),
+                    inline=False
+                )
+
+                if plan.ops:
+                    plan_text = "\n".join(op.describe() for op in plan.ops[:15])
+                    if len(plan.ops) > 15:
+                        plan_text += f"\n... and {len(plan.ops) - 15} more changes"
+
+                    embed.add_field(
+                        name="📝 Changes",
+                        value=f"```{plan_text}```",
+                        inline=False
+                    )
+
+                embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+                await interaction.followup.send(embed=embed)
+                return
+
+            progress = asyncio.create_task(report_restore_progress(interaction, scheduler))
+            try:
+                await self.engine.restore(job)
+            finally:
+                progress.cancel()
+            results, errors, timings, applied = job.results, job.errors, job.timings, job.applied
+            await interaction.edit_original_response(content=f"✅ Restore finished: {len(scheduler.tasks)} changes processed")
+
+            # Create success embed
+            embed = discord.Embed(
+                title="🔄 Server Restore Complete!",
+                description=f"Successfully restored from backup: `{backup_filename}`",
+                color=discord.Color.green(),
+                timestamp=datetime.now()
+            )
+
+            applied_text = [f"**{kind.title()}:** {applied[kind]}/{counts[kind]}" for kind in KINDS]
+            reordered = [section for section in sorted(plan.reorder) if results.get(f"positions:{section}") is not None]
+            if plan.reorder:
+                applied_text.append(f"**Reordered:** {', '.join(reordered) or 'none'}")
+            if job.member_roles is not None:
+                applied_text.append(f"**Members Updated:** {count_member_updates(results)}/{job.member_updates}")
+            if job.resuming:
+                applied_text.append(f"**Resumed:** {job.already_done} change(s) were already done before the interruption")
+            embed.add_field(
+                name="📊 Applied Changes",
+                value="\n".join(applied_text),
+                inline=False
+            )
+
+            if timings:
+                timing_text = [f"**{phase.title()}:** {timings[phase]:.1f}s" for phase in PHASES if phase in timings]
+                # Summed over workers, so spread it back out to approximate wall time
+                budget_wait = scheduler.governor_wait / scheduler.workers
+                if budget_wait >= 1:
+                    timing_text.append(f"**Waiting For API Budget:** {budget_wait:.1f}s")
+                embed.add_field(
+                    name="⏱️ Timings",
+                    value="\n".join(timing_text),
+                    inline=False
+                )
+
+            if replay:
+                # Replays are rate limited and can take far longer than an interaction lasts
+                targets = self.engine.replay_targets(job)
+                if targets:
+                    task = asyncio.create_task(replay_messages(targets))
+                    self.background_tasks.add(task)
+                    task.add_done_callback(self.background_tasks.discard)
+                embed.add_field(
+                    name="💬 Message Replay",
+                    value=f"Replaying exported messages into {len(targets)} recreated channel(s) in the background",
+                    inline=False
+                )
+
+            if errors:
+                error_text = "\n".join(errors[:5])  # Show first 5 errors
+                if len(errors) > 5:
+                    error_text += f"\n... and {len(errors) - 5} more errors"
+
+                embed.add_field(
+                    name="⚠️ Errors",
+                    value=f"```{error_text}```",
+                    inline=False
+                )
+
+            embed.set_footer(text=f"Requested by {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            error_embed = discord.Embed(
+                title="❌ Restore Failed",
+                description=f"An error occurred while restoring the backup: {str(e)}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=error_embed)
@@ -0,0 +1,156 @@
+import gzip
+import json
+import struct
+
+from blackup.capture import SECTIONS
+from blackup.integrity import atomic_write, read_payload
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"BLKP"
+VERSION = 1
+EXTENSION = ".blkp"
+
+GZIP = 1
+ZSTD = 2
+
+# Snowflakes are stored as integers instead of quoted strings
+ID_FIELDS = ("id", "category_id", "owner_id", "target_id")
+OVERWRITE_TYPES = ("role", "member")
+
+_HEADER = struct.Struct(">4sBB")
+
+
+def _pack_id(value):
+    return int(value) if isinstance(value, str) and value.isdigit() else value
+
+
+def _unpack_id(value):
+    return str(value) if isinstance(value, int) else value
+
+
+def _encode_section(records):
+    """Turn a list of records into columns plus a flat overwrite table.
+
+    A record may not have every column (voice channels have no topic), so a
+    per-record bitmask marks which fields are present.
+    """
+    fields = []
+    for record in records:
+        for field in record:
+            if field != "overwrites" and field not in fields:
+                fields.append(field)
+
+    columns = [[] for _ in fields]
+    present = []
+    overwrites = [[], [], [], [], []]  # owner, type, target, allow, deny
+    for index, record in enumerate(records):
+        mask = 0
+        for i, field in enumerate(fields):
+            if field in record:
+                mask |= 1 << i
+                value = record[field]
+                columns[i].append(_pack_id(value) if field in ID_FIELDS else value)
+            else:
+                columns[i].append(None)
+        present.append(mask)
+
+        for o in record.get("overwrites", ()):
+            overwrites[0].append(index)
+            overwrites[1].append(OVERWRITE_TYPES.index(o["target_type"]))
+            overwrites[2].append(_pack_id(o["target_id"]))
+            overwrites[3].append(o["allow"])
+            overwrites[4].append(o["deny"])
+
+    section = {"n": len(records), "fields": fields, "columns": columns, "present": present}
+    if any("overwrites" in record for record in records):
+        section["overwrites"] = overwrites
+    return section
+
+
+def _decode_section(section):
+    fields = section["fields"]
+    columns = section["columns"]
+    records = []
+    for index in range(section["n"]):
+        mask = section["present"][index]
+        record = {}
+        for i, field in enumerate(fields):
+            if mask & (1 << i):
+                value = columns[i][index]
+                record[field] = _unpack_id(value) if field in ID_FIELDS else value
+        records.append(record)
+
+    if "overwrites" in section:
+        for record in records:
+            record["overwrites"] = []
+        owner, kind, target, allow, deny = section["overwrites"]
+        for i in range(len(owner)):
+            records[owner[i]]["overwrites"].append({
+                "target_type": OVERWRITE_TYPES[kind[i]],
+                "target_id": _unpack_id(target[i]),
+                "allow": allow[i],
+                "deny": deny[i]
+            })
+    return records
+
+
+def encode(backup_data, compression=None):
+    """Serialize a backup dict into the compact binary format"""
+    if compression is None:
+        compression = ZSTD if zstandard is not None else GZIP
+
+    payload = {"server_info": {
+        k: _pack_id(v) if k in ID_FIELDS else v
+        for k, v in backup_data["server_info"].items()
+    }}
+    for section in SECTIONS:
+        payload[section] = _encode_section(backup_data.get(section, []))
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    if compression == ZSTD:
+        body = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        body = gzip.compress(raw, compresslevel=6)
+    return _HEADER.pack(MAGIC, VERSION, compression) + body
+
+
+def decode(data):
+    """Inverse of encode()"""
+    magic, version, compression = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a compact backup file")
+    if version > VERSION:
+        raise ValueError(f"Compact backup version {version} is newer than this bot supports")
+
+    body = data[_HEADER.size:]
+    if compression == ZSTD:
+        if zstandard is None:
+            raise ValueError("This backup is zstd-compressed; install the zstandard package to read it")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raw = gzip.decompress(body)
+
+    payload = json.loads(raw)
+    backup_data = {"server_info": {
+        k: _unpack_id(v) if k in ID_FIELDS else v
+        for k, v in payload["server_info"].items()
+    }}
+    for section in SECTIONS:
+        backup_data[section] = _decode_section(payload[section])
+    return backup_data
+
+
+def is_compact(head):
+    return head[:len(MAGIC)] == MAGIC
+
+
+def write_compact(filename, backup_data, compression=None):
+    return atomic_write(filename, encode(backup_data, compression))
+
+
+def read_compact(path, verified=False):
+    return decode(read_payload(path, verified))
@@ -0,0 +1,416 @@
+import asyncio
+import functools
+import json
+import time
+import zlib
+from datetime import timedelta
+
+import jinja2
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from blackup.catalog import get_catalog
+from blackup.events import get_event_bus
+from blackup.governor import get_governor
+from blackup.metrics import RENDER_DURATION, metrics_handler, start_loop_monitor
+from blackup.sharding import ShardWorkers
+from blackup.storage import get_storage
+
+# Guild cards per dashboard page, and the CDN size their icons are fetched at
+GUILD_PAGE_SIZE = 48
+ICON_SIZE = 64
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Seconds between uptime ticks and keep-alive comments on the live feed
+TICK_INTERVAL = 5
+KEEPALIVE_INTERVAL = 15
+
+
+def format_uptime(start_time):
+    if not start_time:
+        return 'Unknown'
+
+    uptime_seconds = int(time.time() - start_time)
+    uptime_delta = timedelta(seconds=uptime_seconds)
+
+    days = uptime_delta.days
+    hours, remainder = divmod(uptime_delta.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    if days > 0:
+        return f"{days}d {hours}h {minutes}m {seconds}s"
+    elif hours > 0:
+        return f"{hours}h {minutes}m {seconds}s"
+    elif minutes > 0:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+def server_info(guild):
+    # Get server owner name
+    owner_name = "Unknown"
+    if guild.owner:
+        owner_name = guild.owner.display_name
+
+    return {
+        'id': str(guild.id),
+        'name': guild.name,
+        'description': guild.description,
+        'owner_name': owner_name,
+        'invite_url': None,
+        'icon_url': str(guild.icon.with_size(ICON_SIZE).url) if guild.icon else None
+    }
+
+
+class DashboardStats:
+    """Guild list and totals for the dashboard, kept up to date from events.
+
+    Gateway events and catalog writes adjust the cached numbers in place, so
+    rendering never walks every guild. A full rebuild still happens when the
+    cache is older than ``ttl`` seconds, to correct any drift from missed
+    events. ``version`` goes up on every change and backs the API's ETags.
+    """
+
+    def __init__(self, bot, ttl=300, events=None, catalog=None):
+        self.bot = bot
+        self.ttl = ttl
+        self.events = events or get_event_bus()
+        self.catalog = catalog or get_catalog()
+        self.loop = None
+        self.built_at = None
+        self.version = 0
+        self._sorted = None
+        self.servers = {}
+        self.members = {}
+        self.channels = {}
+        self.backups = {}
+        self.total_members = 0
+        self.total_channels = 0
+        self.total_backups = 0
+
+    def attach(self, loop):
+        self.loop = loop
+        self.catalog.listeners.append(self._catalog_changed)
+        for event in ("guild_join", "guild_remove", "guild_update", "guild_channel_create",
+                      "guild_channel_delete", "member_join", "member_remove"):
+            self.bot.add_listener(getattr(self, f"on_{event}"), f"on_{event}")
+
+    def rebuild(self, backup_totals):
+        self.servers = {}
+        self.members = {}
+        self.channels = {}
+        self.backups = {}
+        self.total_members = self.total_channels = self.total_backups = 0
+        for guild in self.bot.guilds:
+            self._add(guild, backup_totals.get(str(guild.id), (0, 0))[0])
+        self.built_at = time.monotonic()
+        self._touch()
+
+    def stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > self.ttl
+
+    def _touch(self):
+        self.version += 1
+        self._sorted = None
+
+    def totals(self):
+        return {
+            'total_servers': len(self.servers),
+            'total_members': self.total_members,
+            'total_channels': self.total_channels,
+            'total_backups': self.total_backups
+        }
+
+    def sorted_servers(self, query=''):
+        """Servers ordered by name, optionally filtered by name or exact ID"""
+        if self._sorted is None:
+            # Cached until the next change, along with the lowercased names for search
+            self._sorted = sorted(
+                ((s['name'].lower(), s) for s in self.servers.values()),
+                key=lambda item: (item[0], item[1]['id'])
+            )
+        query = query.strip().lower()
+        return [s for name, s in self._sorted if not query or query in name or query == s['id']]
+
+    def _add(self, guild, backup_count):
+        self._remove(guild.id)
+        self.servers[guild.id] = server_info(guild)
+        self.members[guild.id] = guild.member_count or 0
+        self.channels[guild.id] = len(guild.channels)
+        self.backups[guild.id] = backup_count
+        self.total_members += self.members[guild.id]
+        self.total_channels += self.channels[guild.id]
+        self.total_backups += backup_count
+        self._touch()
+
+    def _remove(self, guild_id):
+        if guild_id not in self.servers:
+            return
+        del self.servers[guild_id]
+        self.total_members -= self.members.pop(guild_id)
+        self.total_channels -= self.channels.pop(guild_id)
+        self.total_backups -= self.backups.pop(guild_id)
+        self._touch()
+
+    def _adjust(self, counts, guild_id, delta, total):
+        if guild_id in counts:
+            counts[guild_id] += delta
+            setattr(self, total, getattr(self, total) + delta)
+            self._touch()
+
+    def _catalog_changed(self, guild_id):
+        # Catalog writes can come from executor threads
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._refresh_backups, int(guild_id))
+
+    def _refresh_backups(self, guild_id):
+        if guild_id in self.backups:
+            count = self.catalog.count(guild_id)
+            if count != self.backups[guild_id]:
+                self._adjust(self.backups, guild_id, count - self.backups[guild_id], "total_backups")
+                self.events.publish("stats", **self.totals())
+
+    async def on_guild_join(self, guild):
+        self._add(guild, self.catalog.count(guild.id))
+        self.events.publish("guild_join", guild=self.servers[guild.id], **self.totals())
+
+    async def on_guild_remove(self, guild):
+        if guild.id in self.servers:
+            self._remove(guild.id)
+            self.events.publish("guild_remove", guild_id=str(guild.id), **self.totals())
+
+    async def on_guild_update(self, before, after):
+        if after.id in self.servers:
+            self.servers[after.id] = server_info(after)
+            self._touch()
+
+    async def on_guild_channel_create(self, channel):
+        self._adjust(self.channels, channel.guild.id, 1, "total_channels")
+
+    async def on_guild_channel_delete(self, channel):
+        self._adjust(self.channels, channel.guild.id, -1, "total_channels")
+
+    async def on_member_join(self, member):
+        self._adjust(self.members, member.guild.id, 1, "total_members")
+
+    async def on_member_remove(self, member):
+        self._adjust(self.members, member.guild.id, -1, "total_members")
+
+
+def paginate(items, page, per_page):
+    """Slice one 1-based page out of items; returns (page_items, page, pages)"""
+    pages = max(1, -(-len(items) // per_page))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * per_page
+    return items[start:start + per_page], page, pages
+
+
+def get_bot_data(bot, start_time, stats, page=1, query=''):
+    """Get bot data for web dashboard from the cached stats"""
+    if not bot.is_ready():
+        return {
+            'bot_online': False,
+            'servers': [],
+            'page': 1,
+            'pages': 1,
+            'query': query,
+            'matched': 0,
+            'total_servers': 0,
+            'total_members': 0,
+            'total_channels': 0,
+            'total_backups': 0,
+            'uptime': '0 seconds'
+        }
+
+    matched = stats.sorted_servers(query)
+    servers, page, pages = paginate(matched, page, GUILD_PAGE_SIZE)
+    return {
+        'bot_online': True,
+        'servers': servers,
+        'page': page,
+        'pages': pages,
+        'query': query,
+        'matched': len(matched),
+        'total_servers': len(stats.servers),
+        'total_members': stats.total_members,
+        'total_channels': stats.total_channels,
+        'total_backups': stats.total_backups,
+        'uptime': format_uptime(start_time)
+    }
+
+
+class Dashboard:
+    """aiohttp web dashboard served from the bot's own event loop"""
+
+    def __init__(self, bot, template_dir, host='0.0.0.0', port=5000, shards=None, storage=None):
+        self.bot = bot
+        # Only read for health here; the bot routes its jobs through the same object
+        self.shards = shards or ShardWorkers(bot)
+        self.host = host
+        self.port = port
+        self.start_time = None
+        self.env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(template_dir),
+            autoescape=jinja2.select_autoescape(["html"])
+        )
+        self.events = get_event_bus()
+        # Backup counts come from the same storage the bot's commands write to
+        self.storage = storage or get_storage()
+        self.stats = DashboardStats(bot, events=self.events, catalog=self.storage.catalog)
+        self.app = web.Application()
+        self.app.router.add_get('/', self.index)
+        self.app.router.add_get('/api/stats', self.api_stats)
+        self.app.router.add_get('/api/guilds', self.api_guilds)
+        self.app.router.add_get('/api/shards', self.api_shards)
+        self.app.router.add_get('/api/events', self.api_events)
+        self.app.router.add_get('/metrics', metrics_handler)
+        self.runner = None
+        self.ticker = None
+
+    def render(self, template, **context):
+        start = time.perf_counter()
+        html = self.env.get_template(template).render(**context)
+        RENDER_DURATION.observe(time.perf_counter() - start, template=template)
+        return web.Response(text=html, content_type='text/html')
+
+    @staticmethod
+    async def compress(request, response):
+        """Brotli when the client and server both support it, else gzip/deflate"""
+        response.headers['Vary'] = 'Accept-Encoding'
+        accept = request.headers.get('Accept-Encoding', '').lower()
+        if brotli is not None and 'br' in accept:
+            compress = functools.partial(brotli.compress, response.body, quality=5)
+            response.body = await asyncio.get_running_loop().run_in_executor(None, compress)
+            response.headers['Content-Encoding'] = 'br'
+        elif 'gzip' in accept:
+            response.enable_compression(web.ContentCoding.gzip)
+        else:
+            response.enable_compression()
+        return response
+
+    @staticmethod
+    def query_int(request, name, default):
+        try:
+            return int(request.query.get(name, default))
+        except ValueError:
+            raise web.HTTPBadRequest(text=f'{name} must be an integer')
+
+    async def index(self, request):
+        """Main dashboard page, one page of the guild list at a time"""
+        await self.refresh_stats()
+        data = get_bot_data(self.bot, self.start_time, self.stats,
+                            page=self.query_int(request, 'page', 1), query=request.query.get('q', '')[:100])
+        data['shards'] = self.shards.health() if data['bot_online'] else []
+        return await self.compress(request, self.render('index.html', **data))
+
+    async def api_stats(self, request):
+        """Totals and uptime as JSON"""
+        await self.refresh_stats()
+        data = get_bot_data(self.bot, self.start_time, self.stats)
+        for key in ('servers', 'page', 'pages', 'query', 'matched'):
+            del data[key]
+        data['uptime_seconds'] = int(time.time() - self.start_time) if self.start_time else 0
+        data['api_budget'] = get_governor().stats()
+        return web.json_response(data, headers={'Cache-Control': 'no-cache'})
+
+    async def api_shards(self, request):
+        """Connection state, latency and job queue of each shard this process runs"""
+        return web.json_response({
+            'shard_count': self.bot.shard_count or 1,
+            'shards': self.shards.health() if self.bot.is_ready() else []
+        }, headers={'Cache-Control': 'no-cache'})
+
+    async def api_guilds(self, request):
+        """One page of the guild list, sorted by name, with ETag support"""
+        page = self.query_int(request, 'page', 1)
+        per_page = min(max(self.query_int(request, 'per_page', API_PAGE_SIZE), 1), API_MAX_PAGE_SIZE)
+        query = request.query.get('q', '')[:100]
+
+        await self.refresh_stats()
+        # The version resets on restart, so the start time keeps old tags from matching
+        tag = f'{int(self.start_time or 0)}-{self.stats.version}-{page}-{per_page}-{query}'
+        etag = f'"{zlib.crc32(tag.encode()):08x}-{self.stats.version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in request.headers.get('If-None-Match', ''):
+            raise web.HTTPNotModified(headers=headers)
+
+        matched = self.stats.sorted_servers(query) if self.bot.is_ready() else []
+        guilds, page, pages = paginate(matched, page, per_page)
+        response = web.json_response({
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'total': len(matched),
+            'guilds': guilds
+        }, headers=headers)
+        return await self.compress(request, response)
+
+    async def api_events(self, request):
+        """Server-sent events: uptime ticks, guild join/leave and backup progress"""
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        await response.prepare(request)
+        queue = self.events.subscribe()
+        try:
+            await self.refresh_stats()
+            await response.write(self._sse("hello", uptime=format_uptime(self.start_time), **self.stats.totals()))
+            while self.events.is_subscribed(queue):
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                await response.write(self._sse(event, **data))
+        except ConnectionResetError:
+            pass
+        finally:
+            # Also reached when the bus dropped a client that fell too far behind
+            self.events.unsubscribe(queue)
+        return response
+
+    @staticmethod
+    def _sse(event, **data):
+        return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(TICK_INTERVAL)
+            if self.events.subscribers:
+                self.events.publish("uptime", uptime=format_uptime(self.start_time))
+                if self.bot.is_ready():
+                    self.events.publish("shards", shards=self.shards.health())
+
+    async def refresh_stats(self):
+        if self.bot.is_ready() and self.stats.stale():
+            backup_totals = await asyncio.get_running_loop().run_in_executor(None, self.storage.catalog.totals)
+            # No awaits from here on, so the rebuild sees one consistent bot.guilds
+            self.stats.rebuild(backup_totals)
+
+    async def start(self):
+        if self.runner is not None:
+            return
+        self.start_time = time.time()
+        self.stats.attach(asyncio.get_running_loop())
+        self.ticker = asyncio.create_task(self._tick())
+        start_loop_monitor()
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+    async def stop(self):
+        if self.ticker is not None:
+            self.ticker.cancel()
+            self.ticker = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
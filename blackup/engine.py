@@ -0,0 +1,178 @@
+import asyncio
+import functools
+
+from blackup.backups import create_backup
+from blackup.formats import load_backup
+from blackup.journal import RestoreJournal, load_journal, restore_journal_path
+from blackup.members import read_member_snapshot
+from blackup.messages import messages_dir, replay_targets
+from blackup.planner import plan_changes
+from blackup.restore import RouteBuckets, count_applied, schedule_plan
+from blackup.storage import get_storage
+
+
+class NoMemberRoles(LookupError):
+    """Member roles were asked for, but the backup was taken without them"""
+
+
+class RestoreInProgress(RuntimeError):
+    """Another restore is already running in the guild and would share its journal"""
+
+
+async def _run_now(guild_id, job):
+    return await job()
+
+
+async def _in_executor(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+class RestoreJob:
+    """A backup diffed against a guild and scheduled, ready to apply"""
+
+    def __init__(self, guild, filename, backup_data, plan, scheduler, journal, previous=None, member_roles=None):
+        self.guild = guild
+        self.filename = filename
+        self.backup_data = backup_data
+        self.plan = plan
+        self.counts = plan.counts()
+        self.scheduler = scheduler
+        self.journal = journal
+        # Journal state of the interrupted restore being resumed
+        self.previous = previous
+        self.member_roles = member_roles
+        self.member_updates = sum(1 for key in scheduler.tasks if key.startswith("members:"))
+        self.results = {}
+        self.errors = []
+        self.timings = {}
+        self.applied = None
+
+    @property
+    def resuming(self):
+        return self.previous is not None
+
+    @property
+    def already_done(self):
+        return len(self.previous.completed) if self.previous is not None else 0
+
+
+class BackupEngine:
+    """Back up, list, verify and restore guilds, with no Discord UI attached.
+
+    ``storage`` decides where backups live (LocalStorage under ``backups/``
+    by default). Guilds are the transport: anything shaped like
+    discord.Guild works, so the bots pass live guilds and benchmarks pass
+    benchmarks.fakes.FakeGuild. ``run(guild_id, job)`` runs a guild's long
+    jobs, e.g. ShardWorkers.run to put them on the guild's shard; by
+    default they are just awaited. ``governor`` and ``route_limits`` are
+    the API budget and extra per-route limits restores draw from; unless
+    given, the shared governor and discord.py's own per-bucket handling.
+    """
+
+    def __init__(self, storage=None, run=None, governor=None, route_limits=None):
+        self.storage = storage or get_storage()
+        self.run = run or _run_now
+        self.governor = governor
+        self.route_limits = route_limits
+        # Guilds with a restore between plan_restore and the end of restore
+        self.restoring = set()
+
+    def restore_in_progress(self, guild_id):
+        return str(guild_id) in self.restoring
+
+    async def backup(self, guild, backup_name=None, backup_format="json", include_members=False):
+        return await self.run(guild.id, lambda: create_backup(
+            guild, backup_name, backup_format, include_members, self.storage
+        ))
+
+    async def count(self, guild_id):
+        """How many backups a guild has, indexing any the catalog hasn't seen yet"""
+        catalog = self.storage.catalog
+        await _in_executor(catalog.sync, guild_id, self.storage.server_dir(guild_id))
+        return catalog.count(guild_id)
+
+    async def reset(self, guild_id):
+        """Delete every backup of a guild; returns how many files went"""
+        return await _in_executor(self.storage.delete_all, guild_id)
+
+    async def verify(self, guild_id, filename):
+        """Check a backup against its checksum in chunks; raises IntegrityError"""
+        return await _in_executor(self.storage.catalog.verify, guild_id, self.storage.path(guild_id, filename))
+
+    async def plan_restore(self, guild, filename, prune=False, member_roles=False, dry_run=False):
+        """Verify a backup, diff it against the guild and schedule the changes.
+
+        An interrupted restore of the same backup is resumed: objects it
+        already created are matched by ID and its finished tasks skipped.
+        Raises IntegrityError for a damaged file, NoMemberRoles when
+        ``member_roles`` is set but the backup has none, and
+        RestoreInProgress when the guild is already being restored. Unless
+        it's a dry run, the guild stays claimed until ``restore`` finishes.
+        """
+        if dry_run:
+            return await self._plan_restore(guild, filename, prune, member_roles, dry_run)
+        # One journal per guild, so two restores at once would corrupt each other's
+        if self.restore_in_progress(guild.id):
+            raise RestoreInProgress(guild.id)
+        self.restoring.add(str(guild.id))
+        try:
+            job = await self._plan_restore(guild, filename, prune, member_roles, dry_run)
+        except BaseException:
+            self.restoring.discard(str(guild.id))
+            raise
+        if not job.scheduler.tasks:
+            self.restoring.discard(str(guild.id))
+        return job
+
+    async def _plan_restore(self, guild, filename, prune, member_roles, dry_run):
+        path = self.storage.path(guild.id, filename)
+        await self.verify(guild.id, filename)
+        # Reading and parsing a large backup would stall every shard's heartbeat on the loop,
+        # and the checksum was just checked, so it isn't hashed again
+        backup_data = await _in_executor(functools.partial(load_backup, path, verified=True))
+
+        journal_path = restore_journal_path(self.storage.server_dir(guild.id))
+        previous = await _in_executor(load_journal, journal_path)
+        if previous is None or not previous.interrupted or previous.backup != filename:
+            previous = None
+
+        # Diff the backup against the live guild so only drifted objects are touched
+        plan = plan_changes(guild, backup_data, prune=prune, id_map=previous.id_map if previous else None)
+
+        snapshot = None
+        if member_roles:
+            snapshot = await _in_executor(read_member_snapshot, path)
+            if snapshot is None:
+                raise NoMemberRoles(filename)
+            if not guild.chunked:
+                await guild.chunk()
+
+        # Changes run concurrently, each one waiting only on the objects it references
+        journal = None if dry_run else RestoreJournal(journal_path)
+        scheduler = schedule_plan(guild, plan, buckets=RouteBuckets(self.route_limits), member_roles=snapshot,
+                                  governor=self.governor, journal=journal)
+        job = RestoreJob(guild, filename, backup_data, plan, scheduler, journal, previous, snapshot)
+
+        if previous is not None and journal is not None and not scheduler.tasks:
+            # Nothing left to do, so the interrupted restore is complete
+            await journal.finish(0, 0)
+        return job
+
+    async def restore(self, job):
+        """Apply a planned restore, journaling each finished change"""
+        try:
+            await job.journal.begin(job.filename, job.scheduler, resume_from=job.previous)
+            try:
+                job.results, job.errors, job.timings = await self.run(job.guild.id, job.scheduler.run)
+            finally:
+                await job.journal.close()
+            job.applied = count_applied(job.plan, job.results)
+            await job.journal.finish(sum(job.applied.values()), len(job.errors))
+        finally:
+            self.restoring.discard(str(job.guild.id))
+        return job
+
+    def replay_targets(self, job):
+        """Channels a restore recreated, paired with their exported messages"""
+        source_id = job.backup_data.get("server_info", {}).get("id", job.guild.id)
+        return replay_targets(job.plan, job.results, messages_dir(self.storage.server_dir(source_id)))
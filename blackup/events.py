@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+
+class EventBus:
+    """In-process publish/subscribe for live updates such as the dashboard feed.
+
+    Each subscriber gets a bounded queue. A subscriber that falls too far
+    behind is dropped instead of letting its queue grow without bound.
+    ``publish`` must be called from the event loop thread.
+    """
+
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self.subscribers = set()
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def is_subscribed(self, queue):
+        return queue in self.subscribers
+
+    def publish(self, event, **data):
+        data.setdefault("time", time.time())
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+
+
+_bus = EventBus()
+
+
+def get_event_bus():
+    return _bus
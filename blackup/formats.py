@@ -0,0 +1,122 @@
+import json
+import os
+import re
+from datetime import datetime
+
+from blackup import compact, snapshots
+from blackup.capture import SECTIONS
+from blackup.integrity import atomic_write
+
+BACKUP_EXTENSIONS = (".json", compact.EXTENSION)
+
+# Fields planner.py and restore.py index without a default, with their types
+_RECORD_FIELDS = {
+    "categories": {"name": str, "id": str, "position": int, "overwrites": list},
+    "channels": {"name": str, "id": str, "type": str, "position": int, "overwrites": list,
+                 "category_id": (str, type(None))},
+    "roles": {"name": str, "id": str, "color": int, "hoist": bool, "mentionable": bool,
+              "permissions": int, "position": int},
+    "emojis": {"name": str, "id": str, "url": str}
+}
+_OVERWRITE_FIELDS = {"target_type": str, "target_id": str, "allow": int, "deny": int}
+# Forum channels' available_tags entries
+_TAG_FIELDS = {"name": str, "emoji": (str, type(None)), "moderated": bool}
+
+_TIMESTAMP = re.compile(r"_(\d{8}_\d{6})\.[a-z]+$")
+
+
+def is_backup_file(filename):
+    return filename.endswith(BACKUP_EXTENSIONS)
+
+
+def backup_extension(backup_format):
+    return compact.EXTENSION if backup_format == "compact" else ".json"
+
+
+def backup_time(path):
+    """When a backup was taken, from its filename or else its mtime"""
+    match = _TIMESTAMP.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def detect_format(path):
+    """Format name of a backup file, from its first few bytes"""
+    with open(path, "rb") as f:
+        head = f.read(64)
+    if compact.is_compact(head):
+        return "compact"
+    # Manifests are written compactly with "format" as the first key
+    if head.startswith(b'{"format":"manifest"'):
+        return "incremental"
+    return "json"
+
+
+def load_backup(path, verified=False):
+    """Load any backup format into a full backup dict.
+
+    Compact files are recognised by their magic bytes, snapshot manifests by
+    their ``format`` key; anything else is a legacy JSON backup. Set
+    ``verified`` when the file's checksum was just checked.
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(compact.MAGIC))
+    if compact.is_compact(head):
+        return compact.read_compact(path, verified)
+    return snapshots.load_backup(path, verified)
+
+
+def list_backup_files(server_dir):
+    if not os.path.isdir(server_dir):
+        return []
+    return [f for f in os.listdir(server_dir) if is_backup_file(f)]
+
+
+def write_backup(path, backup_data, backup_format="json"):
+    """Write a full backup dict in any format, atomically and with a checksum trailer"""
+    if backup_format == "compact":
+        compact.write_compact(path, backup_data)
+    elif backup_format == "incremental":
+        snapshots.get_store(os.path.dirname(path) or ".").write_manifest(path, backup_data)
+    else:
+        # The same bytes the streaming writer produces
+        atomic_write(path, json.dumps(backup_data, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+def _field_problems(where, record, fields):
+    if not isinstance(record, dict):
+        return [f"{where} is not an object"]
+    problems = []
+    for field, kind in fields.items():
+        if field not in record:
+            problems.append(f"{where} has no {field}")
+        elif not isinstance(record[field], kind):
+            expected = " or ".join(k.__name__ for k in kind) if isinstance(kind, tuple) else kind.__name__
+            problems.append(f"{where}.{field} should be {expected}, not {type(record[field]).__name__}")
+    return problems
+
+
+def schema_problems(backup_data, limit=20):
+    """What stops a loaded backup dict from being restored; empty when it's valid"""
+    if not isinstance(backup_data, dict):
+        return ["backup is not an object"]
+    problems = _field_problems("server_info", backup_data.get("server_info"), {"name": str, "id": str})
+    for section in SECTIONS:
+        records = backup_data.get(section)
+        if not isinstance(records, list):
+            problems.append(f"{section} is missing or not a list")
+            continue
+        for index, record in enumerate(records):
+            where = f"{section}[{index}]"
+            problems += _field_problems(where, record, _RECORD_FIELDS[section])
+            for o_index, overwrite in enumerate(record.get("overwrites", []) if isinstance(record, dict) else []):
+                problems += _field_problems(f"{where}.overwrites[{o_index}]", overwrite, _OVERWRITE_FIELDS)
+            tags = record.get("available_tags") if isinstance(record, dict) else None
+            if tags is not None and not isinstance(tags, list):
+                problems.append(f"{where}.available_tags should be list, not {type(tags).__name__}")
+            for t_index, tag in enumerate(tags if isinstance(tags, list) else []):
+                problems += _field_problems(f"{where}.available_tags[{t_index}]", tag, _TAG_FIELDS)
+            if len(problems) >= limit:
+                return problems[:limit]
+    return problems[:limit]
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from blackup.metrics import GOVERNOR_WAIT, RATE_LIMIT_WAIT
+from blackup.sharding import process_count
+
+# Lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Governor:
+    """Process-wide token bucket for API mutations.
+
+    Every restore, replay or other mutation-heavy job asks for a token
+    before each call. Waiting callers are grouped by priority and then by
+    guild. Tokens go to the most urgent priority first, and round-robin
+    between guilds inside it, so one large restore can't starve a small
+    one. ``rate`` is tokens per second and ``burst`` the bucket size; the
+    defaults keep a full burst plus a second of refill under Discord's
+    global limit of 50 requests per second.
+    """
+
+    def __init__(self, rate=40.0, burst=8, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.queues = {}
+        self.waiting = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.granted = 0
+        self.wait_time = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, guild_id, priority=BACKGROUND):
+        """Wait for a token to make one API call for guild_id"""
+        self._refill()
+        if not self.waiting and self.tokens >= 1:
+            self.tokens -= 1
+            self.granted += 1
+            GOVERNOR_WAIT.observe(0.0, priority=priority)
+            return
+
+        start = self.clock()
+        future = asyncio.get_running_loop().create_future()
+        guilds = self.queues.setdefault(priority, OrderedDict())
+        guilds.setdefault(guild_id, deque()).append(future)
+        self.waiting += 1
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done() or future.cancelled():
+                self._discard(priority, guild_id, future)
+            else:
+                # Granted just as we were cancelled; the token goes back
+                self.tokens += 1
+            raise
+        waited = self.clock() - start
+        self.wait_time += waited
+        GOVERNOR_WAIT.observe(waited, priority=priority)
+        # The budget stands in for Discord's global limit, so its waits are rate-limit waits too
+        RATE_LIMIT_WAIT.observe(waited, route="global")
+
+    def _discard(self, priority, guild_id, future):
+        waiters = self.queues.get(priority, {}).get(guild_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self.waiting -= 1
+            if not waiters:
+                del self.queues[priority][guild_id]
+
+    def _next_waiter(self):
+        for priority in sorted(self.queues):
+            guilds = self.queues[priority]
+            if not guilds:
+                continue
+            guild_id, waiters = next(iter(guilds.items()))
+            future = waiters.popleft()
+            # Rotate so the next token goes to the next guild in line
+            del guilds[guild_id]
+            if waiters:
+                guilds[guild_id] = waiters
+            self.waiting -= 1
+            return future
+        return None
+
+    async def _dispatch(self):
+        while self.waiting:
+            self._refill()
+            while self.tokens >= 1 and self.waiting:
+                future = self._next_waiter()
+                if not future.done():
+                    self.tokens -= 1
+                    self.granted += 1
+                    future.set_result(None)
+            if self.waiting:
+                self.wakeup.clear()
+                delay = (1 - self.tokens) / self.rate
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), max(delay, 0.001))
+                except asyncio.TimeoutError:
+                    pass
+
+    def queued(self, guild_id=None):
+        """Calls waiting for a token, for one guild or overall"""
+        if guild_id is None:
+            return self.waiting
+        return sum(len(guilds.get(guild_id, ())) for guilds in self.queues.values())
+
+    def estimate(self, guild_id, calls, priority=BACKGROUND):
+        """Rough seconds to make ``calls`` more calls for a guild, given current contention"""
+        ahead = sum(
+            len(waiters) for p, guilds in self.queues.items() if p < priority for waiters in guilds.values()
+        )
+        others = set(self.queues.get(priority, ())) - {guild_id}
+        # Higher priorities drain first, then this guild gets a fair share of the rest
+        return (ahead + calls * (len(others) + 1)) / self.rate
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "tokens": self.tokens,
+            "queued": self.waiting,
+            "guilds_waiting": len({gid for guilds in self.queues.values() for gid in guilds}),
+            "granted": self.granted,
+            "wait_time": self.wait_time
+        }
+
+
+_governor = None
+
+
+def get_governor():
+    global _governor
+    if _governor is None:
+        # Discord's global limit is per bot token, so processes launched
+        # together each get an equal share of it
+        processes = process_count()
+        _governor = Governor(rate=40.0 / processes, burst=max(1, 8 / processes))
+    return _governor
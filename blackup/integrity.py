@@ -0,0 +1,212 @@
+import hashlib
+import os
+import re
+
+# Version of the backup dict layout, bumped when sections or fields change meaning
+SCHEMA_VERSION = 1
+
+# Trailers are the same length in every file, so they can be read with a single seek.
+# Binary (compact) files end with one ASCII line. JSON files end with a last
+# "_blackup" key in place of their closing brace, so they stay valid JSON; the
+# checksum covers the payload as it was before, closing brace included.
+# JSON backups written with the ASCII line are still read; rewrite them with
+# "python -m blackup convert BACKUP OUTPUT --force" to make them valid JSON.
+_TRAILER = b"\n#blackup schema=%04d length=%016d sha256=%s\n"
+_TRAILER_RE = re.compile(rb"\n#blackup schema=(\d{4}) length=(\d{16}) sha256=([0-9a-f]{64})\n\Z")
+_JSON_TRAILER = b',\n  "_blackup": {"schema": "%04d", "length": "%016d", "sha256": "%s"}\n}\n'
+_JSON_TRAILER_RE = re.compile(
+    rb',\n  "_blackup": \{"schema": "(\d{4})", "length": "(\d{16})", "sha256": "([0-9a-f]{64})"\}\n\}\n\Z'
+)
+TRAILER_SIZE = len(_TRAILER % (0, 0, b"0" * 64))
+JSON_TRAILER_SIZE = len(_JSON_TRAILER % (0, 0, b"0" * 64))
+_TAIL_SIZE = max(TRAILER_SIZE, JSON_TRAILER_SIZE)
+
+CHUNK_SIZE = 1 << 20
+
+
+class IntegrityError(ValueError):
+    """A backup file is truncated, corrupted or too new to read"""
+
+
+class Trailer:
+    def __init__(self, schema, length, digest, is_json=False):
+        self.schema = schema
+        self.length = length
+        self.digest = digest
+        # A JSON trailer stands in for the payload's closing brace
+        self.is_json = is_json
+        self.size = JSON_TRAILER_SIZE if is_json else TRAILER_SIZE
+
+    def payload_prefix(self, file_size):
+        """How many leading bytes of the file are payload as written"""
+        return file_size - self.size
+
+    @property
+    def restored(self):
+        """Payload bytes the trailer replaced, appended back before hashing"""
+        return b"}" if self.is_json else b""
+
+
+def make_trailer(length, digest, schema=SCHEMA_VERSION, is_json=False):
+    return (_JSON_TRAILER if is_json else _TRAILER) % (schema, length, digest.encode("ascii"))
+
+
+def parse_trailer(tail):
+    """The Trailer at the end of tail, or None for files written before trailers"""
+    match = _JSON_TRAILER_RE.search(tail[-JSON_TRAILER_SIZE:])
+    is_json = match is not None
+    if match is None:
+        match = _TRAILER_RE.search(tail[-TRAILER_SIZE:])
+    if match is None:
+        return None
+    return Trailer(int(match.group(1)), int(match.group(2)), match.group(3).decode("ascii"), is_json)
+
+
+def read_trailer(path):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, size - _TAIL_SIZE))
+        return parse_trailer(f.read(_TAIL_SIZE))
+
+
+def _check(trailer, length, digest, path):
+    if trailer.length != length:
+        raise IntegrityError(f"{os.path.basename(path)} is truncated or has trailing data")
+    if trailer.digest != digest:
+        raise IntegrityError(f"{os.path.basename(path)} failed its checksum")
+    if trailer.schema > SCHEMA_VERSION:
+        raise IntegrityError(
+            f"{os.path.basename(path)} uses backup schema {trailer.schema}, newer than this bot supports"
+        )
+
+
+def _hash_file(path, length, suffix=b""):
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    digest.update(suffix)
+    return digest.hexdigest()
+
+
+def verify_backup(path, expected=None):
+    """Check a backup against its trailer without parsing it.
+
+    Hashes the file in fixed-size chunks. Returns the Trailer, or None for
+    a file without one. Losing the end of a file also loses its trailer,
+    so when the digest recorded at write time is known (``expected``), a
+    file without a trailer is hashed whole and compared against that.
+    Raises IntegrityError on any mismatch.
+    """
+    trailer = read_trailer(path)
+    if trailer is None:
+        if expected is not None and _hash_file(path, os.path.getsize(path)) != expected:
+            raise IntegrityError(f"{os.path.basename(path)} is truncated or was changed after it was written")
+        return None
+    prefix = trailer.payload_prefix(os.path.getsize(path))
+    if prefix < 0:
+        raise IntegrityError(f"{os.path.basename(path)} is truncated or has trailing data")
+    _check(trailer, prefix + len(trailer.restored), _hash_file(path, prefix, trailer.restored), path)
+    return trailer
+
+
+def read_payload(path, verified=False):
+    """A backup file's bytes without its trailer, verified when it has one.
+
+    Pass ``verified`` when verify_backup already passed, to skip hashing
+    the file a second time.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    trailer = parse_trailer(data[-_TAIL_SIZE:])
+    if trailer is None:
+        return data
+    payload = data[:trailer.payload_prefix(len(data))] + trailer.restored
+    if not verified:
+        _check(trailer, len(payload), hashlib.sha256(payload).hexdigest(), path)
+    return payload
+
+
+def _sync_dir(path):
+    # Makes the rename itself durable; not every platform can open a directory
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """Writes a file under a temporary name and renames it into place.
+
+    Readers only ever see the old file or the complete new one. The
+    payload is hashed as it is written and, with ``trailer`` set, followed
+    by a checksum trailer; a JSON object's trailer goes inside it, as its
+    last key. There is a single fsync, in ``commit``.
+    """
+
+    def __init__(self, path, trailer=True):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.trailer = trailer
+        self.digest = hashlib.sha256()
+        self.length = 0
+        # First and last bytes written, to tell a JSON object from binary data
+        self.head = b""
+        self.tail = b""
+        self.f = open(self.tmp_path, "wb")
+
+    def write(self, data):
+        self.digest.update(data)
+        self.length += len(data)
+        if not self.head:
+            self.head = data[:1]
+        self.tail = (self.tail + data)[-64:]
+        self.f.write(data)
+
+    def _is_json_object(self):
+        # "{}" has no key to put a comma after, so it keeps the line trailer
+        return self.head == b"{" and self.tail.endswith(b"}") and not self.tail[:-1].rstrip().endswith(b"{")
+
+    def commit(self):
+        if self.trailer:
+            is_json = self._is_json_object()
+            if is_json:
+                # The trailer key brings its own closing brace
+                self.f.seek(self.length - 1)
+                self.f.truncate()
+            self.f.write(make_trailer(self.length, self.digest.hexdigest(), is_json=is_json))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+        _sync_dir(self.path)
+
+    def abort(self):
+        self.f.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def atomic_write(path, data, trailer=True):
+    """Write bytes to path atomically; returns the payload length"""
+    writer = AtomicWriter(path, trailer)
+    try:
+        writer.write(data)
+        writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.length
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import time
+
+JOURNAL_FILE = "restore.journal"
+
+# Sections whose task keys end in a backup ID worth remembering
+MAPPED_SECTIONS = ("roles", "categories", "channels", "emojis")
+
+
+def restore_journal_path(server_dir):
+    return os.path.join(server_dir, JOURNAL_FILE)
+
+
+class JournalState:
+    """What a journal says about the restore that wrote it"""
+
+    def __init__(self):
+        self.backup = None
+        self.started = None
+        self.planned = 0
+        self.completed = set()
+        self.failed = set()
+        # Backup ID -> ID of the live object a task created or edited
+        self.id_map = {}
+        self.finished = False
+        self.resumes = 0
+        # Bytes up to the end of the last complete line
+        self.length = 0
+
+    def apply(self, entry):
+        kind = entry["type"]
+        if kind == "begin":
+            self.backup = entry["backup"]
+            self.started = entry["time"]
+            self.planned = len(entry["plan"])
+        elif kind == "resume":
+            self.resumes += 1
+            self.planned = len(entry["plan"])
+        elif kind == "done":
+            key = entry["key"]
+            if entry["ok"]:
+                self.completed.add(key)
+                self.failed.discard(key)
+                section, _, backup_id = key.partition(":")
+                if entry.get("id") and section in MAPPED_SECTIONS and not backup_id.startswith("live:"):
+                    self.id_map[backup_id] = entry["id"]
+            else:
+                self.failed.add(key)
+        elif kind == "finish":
+            self.finished = True
+
+    @property
+    def interrupted(self):
+        return self.backup is not None and not self.finished
+
+
+def load_journal(path):
+    """Replay a journal file; None when there isn't one"""
+    if not os.path.exists(path):
+        return None
+    state = JournalState()
+    with open(path, "rb") as f:
+        for line in f:
+            # A crash mid-write leaves at most one torn line at the end
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            state.apply(entry)
+            state.length += len(line)
+    return state
+
+
+class RestoreJournal:
+    """Append-only record of one restore, so a restart can pick it back up.
+
+    The plan is written when the restore begins, then one line per finished
+    task with the ID of what it created. Lines are buffered and fsynced
+    together, every ``flush_every`` tasks or ``flush_interval`` seconds,
+    rather than once per API call. A crash can lose the last unflushed batch;
+    objects created in it are still found by name when the plan is rebuilt.
+    """
+
+    def __init__(self, path, flush_every=50, flush_interval=1.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = asyncio.Lock()
+        self.pending = asyncio.Event()
+        self.flusher = None
+        self.fsyncs = 0
+
+    def _write(self, lines, mode="a", truncate=None):
+        with open(self.path, mode, encoding="utf-8") as f:
+            if truncate is not None:
+                f.truncate(truncate)
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _line(self, entry):
+        return json.dumps(entry, separators=(",", ":")) + "\n"
+
+    async def begin(self, backup_filename, scheduler, resume_from=None):
+        """Start a new journal, or append to the interrupted one being resumed.
+
+        ``resume_from`` is that journal's loaded state; anything after its
+        last complete line is cut off first.
+        """
+        entry = {
+            "type": "begin" if resume_from is None else "resume",
+            "backup": backup_filename,
+            "time": time.time(),
+            "plan": [[key, task.label] for key, task in scheduler.tasks.items()]
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        async with self.lock:
+            if resume_from is None:
+                args = ([self._line(entry)], "w")
+            else:
+                args = ([self._line(entry)], "a", resume_from.length)
+            await asyncio.get_running_loop().run_in_executor(None, self._write, *args)
+            self.fsyncs += 1
+        self.flusher = asyncio.create_task(self._flush_loop())
+
+    def task_done(self, key, result):
+        """Buffer a finished task; result is None when it failed"""
+        entry = {"type": "done", "key": key, "ok": result is not None}
+        object_id = getattr(result, "id", None)
+        if object_id is not None:
+            entry["id"] = str(object_id)
+        self.buffer.append(self._line(entry))
+        if len(self.buffer) >= self.flush_every:
+            self.pending.set()
+
+    async def flush(self):
+        async with self.lock:
+            if not self.buffer:
+                return
+            lines, self.buffer = self.buffer, []
+            await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+            self.fsyncs += 1
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.pending.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.pending.clear()
+            await self.flush()
+
+    async def finish(self, applied, errors):
+        """Mark the restore complete; a finished journal is never resumed"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        self.buffer.append(self._line({"type": "finish", "time": time.time(), "applied": applied, "errors": errors}))
+        await self.flush()
+
+    async def close(self):
+        """Flush what's buffered without finishing, e.g. when a restore is cancelled"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        await self.flush()
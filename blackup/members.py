@@ -0,0 +1,123 @@
+import asyncio
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from blackup.integrity import atomic_write
+
+MAGIC = b"BLKM"
+VERSION = 1
+EXTENSION = ".members"
+
+_HEADER = struct.Struct("<4sBII")  # magic, version, member count, role count
+_ROLE = struct.Struct("<qI")  # role ID, member count
+
+
+def _to_le(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class MemberRoles:
+    """Which members hold which roles, stored as arrays instead of per-member dicts.
+
+    Member IDs are one sorted int64 array. Each role keeps the sorted
+    indices of its members in that array, delta-encoded before compression,
+    so a 100k-member guild takes a few hundred KB to a few MB.
+    """
+
+    def __init__(self, member_ids, roles):
+        self.member_ids = member_ids
+        self.roles = roles
+
+    @classmethod
+    async def capture(cls, guild, batch_size=5000):
+        members = sorted(guild.members, key=lambda m: m.id)
+        member_ids = array("q", (m.id for m in members))
+        roles = {}
+        for index, member in enumerate(members):
+            if index and index % batch_size == 0:
+                # Give the gateway a turn between batches
+                await asyncio.sleep(0)
+            for role in member.roles:
+                # @everyone is implicit and managed roles can't be assigned by hand
+                if role.is_default() or role.managed:
+                    continue
+                roles.setdefault(role.id, array("I")).append(index)
+        return cls(member_ids, roles)
+
+    def __len__(self):
+        return len(self.member_ids)
+
+    def assignments(self):
+        """{member ID: [role IDs]} for every member holding at least one role"""
+        held = {}
+        for role_id, indices in self.roles.items():
+            for index in indices:
+                held.setdefault(self.member_ids[index], []).append(role_id)
+        return held
+
+    def encode(self):
+        parts = [_to_le(self.member_ids)]
+        for role_id, indices in sorted(self.roles.items()):
+            deltas = array("I", indices)
+            for i in range(len(deltas) - 1, 0, -1):
+                deltas[i] -= deltas[i - 1]
+            parts.append(_ROLE.pack(role_id, len(deltas)))
+            parts.append(_to_le(deltas))
+        body = zlib.compress(b"".join(parts), 6)
+        return _HEADER.pack(MAGIC, VERSION, len(self.member_ids), len(self.roles)) + body
+
+    @classmethod
+    def decode(cls, data):
+        magic, version, member_count, role_count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a member role snapshot")
+        if version > VERSION:
+            raise ValueError(f"Member snapshot version {version} is newer than this bot supports")
+
+        body = zlib.decompress(data[_HEADER.size:])
+        offset = member_count * 8
+        member_ids = _from_le("q", body[:offset])
+        roles = {}
+        for _ in range(role_count):
+            role_id, count = _ROLE.unpack_from(body, offset)
+            offset += _ROLE.size
+            indices = _from_le("I", body[offset:offset + count * 4])
+            offset += count * 4
+            for i in range(1, len(indices)):
+                indices[i] += indices[i - 1]
+            roles[role_id] = indices
+        return cls(member_ids, roles)
+
+
+def member_snapshot_path(backup_path):
+    """Member snapshots sit next to the backup they were taken with"""
+    return os.path.splitext(backup_path)[0] + EXTENSION
+
+
+def write_member_snapshot(backup_path, snapshot):
+    path = member_snapshot_path(backup_path)
+    # The header already guards the format; this only keeps a crash from leaving half a file
+    return atomic_write(path, snapshot.encode(), trailer=False)
+
+
+def read_member_snapshot(backup_path):
+    """The member snapshot taken with a backup, or None if there wasn't one"""
+    path = member_snapshot_path(backup_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return MemberRoles.decode(f.read())
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+
+import discord
+
+from blackup.governor import BACKGROUND, get_governor
+from blackup.restore import RouteBuckets
+
+MESSAGES_DIR = "messages"
+CHECKPOINT_FILE = "checkpoints.json"
+
+# Webhook executions allowed per window in seconds, per replayed channel
+WEBHOOK_LIMIT = (5, 2.0)
+
+_locks = {}
+
+
+def messages_dir(server_dir):
+    return os.path.join(server_dir, MESSAGES_DIR)
+
+
+def channel_export_path(export_dir, channel_id):
+    return os.path.join(export_dir, f"{channel_id}.ndjson")
+
+
+def message_record(message):
+    reference = message.reference.message_id if message.reference else None
+    return {
+        "id": str(message.id),
+        "author_id": str(message.author.id),
+        "author_name": message.author.display_name,
+        "author_avatar": str(message.author.display_avatar.url),
+        "bot": message.author.bot,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "pinned": message.pinned,
+        "reference_id": str(reference) if reference else None,
+        "attachments": [
+            {"filename": a.filename, "url": a.url, "size": a.size}
+            for a in message.attachments
+        ],
+        "embeds": [embed.to_dict() for embed in message.embeds]
+    }
+
+
+class Checkpoints:
+    """Last exported message ID and file length per channel.
+
+    The length is the committed size of the channel's NDJSON file. Anything
+    past it was written by a batch that never got checkpointed, and is cut
+    off before the next batch is appended.
+    """
+
+    def __init__(self, export_dir):
+        self.path = os.path.join(export_dir, CHECKPOINT_FILE)
+        self.channels = {}
+        self.lock = asyncio.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.channels = json.load(f)
+
+    def get(self, channel_id):
+        return self.channels.get(str(channel_id))
+
+    def _save(self, snapshot):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+    async def update(self, channel_id, last_id, offset):
+        async with self.lock:
+            self.channels[str(channel_id)] = {"last_id": last_id, "offset": offset}
+            await asyncio.get_running_loop().run_in_executor(None, self._save, dict(self.channels))
+
+
+class MessageExportReport:
+    def __init__(self):
+        self.channels = 0
+        self.messages = 0
+        self.bytes = 0
+        self.skipped = []
+        self.errors = []
+
+
+def _append(path, offset, data):
+    """Write data at the checkpointed offset and return the new file length"""
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset + len(data)
+
+
+async def export_channel(channel, export_dir, checkpoints, report, batch_size=100):
+    """Append a channel's new messages, oldest first, to its NDJSON file"""
+    loop = asyncio.get_running_loop()
+    path = channel_export_path(export_dir, channel.id)
+    state = checkpoints.get(channel.id)
+    after = discord.Object(id=int(state["last_id"])) if state else None
+    offset = state["offset"] if state else 0
+    batch = []
+
+    async def flush():
+        nonlocal offset
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in batch
+        ).encode("utf-8")
+        offset = await loop.run_in_executor(None, _append, path, offset, data)
+        await checkpoints.update(channel.id, batch[-1]["id"], offset)
+        report.messages += len(batch)
+        report.bytes += len(data)
+        batch.clear()
+
+    async for message in channel.history(limit=None, after=after, oldest_first=True):
+        batch.append(message_record(message))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+
+def export_in_progress(guild_id):
+    lock = _locks.get(str(guild_id))
+    return lock is not None and lock.locked()
+
+
+async def export_messages(guild, server_dir, channels=None, concurrency=4, batch_size=100):
+    """Export message history for many channels at once.
+
+    At most ``concurrency`` channels are read at a time. Each batch is
+    checkpointed as it is written, so an interrupted export picks up from
+    the last committed message when run again, and later runs only fetch
+    messages newer than the previous one.
+    """
+    export_dir = messages_dir(server_dir)
+    os.makedirs(export_dir, exist_ok=True)
+    if channels is None:
+        channels = [
+            channel for channel in guild.text_channels
+            if channel.permissions_for(guild.me).read_message_history
+        ]
+
+    report = MessageExportReport()
+    lock = _locks.setdefault(str(guild.id), asyncio.Lock())
+    async with lock:
+        checkpoints = Checkpoints(export_dir)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(channel):
+            async with semaphore:
+                try:
+                    await export_channel(channel, export_dir, checkpoints, report, batch_size)
+                    report.channels += 1
+                except discord.Forbidden:
+                    report.skipped.append(channel.name)
+                except discord.HTTPException as e:
+                    report.errors.append(f"#{channel.name}: {str(e)}")
+
+        await asyncio.gather(*(run(channel) for channel in channels))
+    return report
+
+
+def replay_content(record):
+    """Message text plus links to its attachments, within Discord's 2000 characters"""
+    parts = [record["content"]] if record["content"] else []
+    parts.extend(attachment["url"] for attachment in record["attachments"])
+    content = "\n".join(parts)
+    return content[:2000] if content else None
+
+
+def replay_targets(plan, results, export_dir):
+    """(live channel, export path) for text channels a restore just created"""
+    targets = []
+    for op in plan.ops:
+        if op.section != "channels" or op.kind != "create" or op.record["type"] != "text":
+            continue
+        channel = results.get(op.key)
+        path = channel_export_path(export_dir, op.record["id"])
+        if channel is not None and os.path.exists(path):
+            targets.append((channel, path))
+    return targets
+
+
+async def replay_channel(channel, path, buckets=None):
+    """Re-post an exported channel through a temporary webhook, rate limited"""
+    buckets = buckets or RouteBuckets({"webhooks": WEBHOOK_LIMIT})
+    webhook = await channel.create_webhook(name="Blackup Replay")
+    sent = 0
+    try:
+        # Reads are tiny next to the webhook rate limit, so they stay inline
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                content = replay_content(record)
+                embeds = [discord.Embed.from_dict(e) for e in record["embeds"][:10]]
+                if not content and not embeds:
+                    continue
+                await buckets.acquire("webhooks")
+                await get_governor().acquire(channel.guild.id, BACKGROUND)
+                try:
+                    await webhook.send(
+                        content=content,
+                        username=record["author_name"][:80],
+                        avatar_url=record["author_avatar"],
+                        embeds=embeds,
+                        allowed_mentions=discord.AllowedMentions.none(),
+                        wait=True
+                    )
+                    sent += 1
+                except discord.HTTPException as e:
+                    print(f"Skipping message {record['id']} in #{channel.name}: {e}")
+    finally:
+        await webhook.delete()
+    return sent
+
+
+async def replay_messages(targets, concurrency=2):
+    """Replay several channels, a few at a time; returns messages sent"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(channel, path):
+        async with semaphore:
+            try:
+                return await replay_channel(channel, path)
+            except discord.HTTPException as e:
+                print(f"Replay into #{channel.name} failed: {e}")
+                return 0
+
+    return sum(await asyncio.gather(*(run(channel, path) for channel, path in targets)))
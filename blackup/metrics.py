@@ -0,0 +1,250 @@
+import asyncio
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+
+from aiohttp import web
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds, in the unit of each metric
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for labelled metrics; each label combination gets its own child"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            # Unlabelled metrics are exported as zero before the first sample
+            self._child({})
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _child(self, labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return key, child
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, child in sorted(self.children.items()):
+            yield from self._samples(key, child)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return [0]
+
+    def inc(self, amount=1, **labels):
+        _, child = self._child(labels)
+        child[0] += amount
+
+    def _samples(self, key, child):
+        yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child[0])}"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram.
+
+    ``observe`` is a bisect and two additions, cheap enough to leave on in
+    hot paths. Buckets are only accumulated when scraped.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        # Per-bucket counts (last one is +Inf), then the running sum
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value, **labels):
+        _, child = self._child(labels)
+        child[0][bisect.bisect_left(self.buckets, value)] += 1
+        child[1] += value
+
+    def _samples(self, key, child):
+        counts, total = child
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, (("le", _format_value(float(bound))),))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(float(total))}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+BACKUP_DURATION = Histogram(
+    "blackup_backup_duration_seconds", "Time to capture and write one backup", ["format"]
+)
+BACKUP_BYTES = Histogram(
+    "blackup_backup_bytes", "Size of each backup file written", ["format"], buckets=BYTES_BUCKETS
+)
+BACKUPS = Counter("blackup_backups", "Backups attempted", ["format", "outcome"])
+RESTORE_PHASE_DURATION = Histogram(
+    "blackup_restore_phase_seconds", "Wall time of each restore phase", ["phase"]
+)
+RESTORE_API_CALLS = Histogram(
+    "blackup_restore_api_calls", "API mutations issued per restore", buckets=COUNT_BUCKETS
+)
+RATE_LIMIT_WAIT = Histogram(
+    "blackup_rate_limit_wait_seconds",
+    "Time spent waiting on a rate limit: route 429s, client route buckets, and \"global\" for the API budget",
+    ["route"]
+)
+LOOP_LAG = Histogram(
+    "blackup_event_loop_lag_seconds", "How late the event loop wakes a sleeping task", buckets=LAG_BUCKETS
+)
+GOVERNOR_WAIT = Histogram(
+    "blackup_api_budget_wait_seconds", "Time a call waited for the shared API budget", ["priority"]
+)
+RENDER_DURATION = Histogram(
+    "blackup_dashboard_render_seconds", "Time to render a dashboard template", ["template"]
+)
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by how late a periodic sleep wakes up"""
+
+    def __init__(self, interval=0.5, histogram=LOOP_LAG):
+        self.interval = interval
+        self.histogram = histogram
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.histogram.observe(max(0.0, time.monotonic() - start - self.interval))
+
+
+_monitor = LoopLagMonitor()
+
+# Routes named the way RouteBuckets and restore tasks name them; the rest are "other"
+_ROUTE_RE = re.compile(r"/(roles|channels|emojis|members|webhooks)\b")
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Observes discord.py's 429 retries, which it only reports through its log"""
+
+    def __init__(self, histogram=RATE_LIMIT_WAIT):
+        super().__init__(logging.WARNING)
+        self.histogram = histogram
+
+    def emit(self, record):
+        # 'We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.'
+        if not str(record.msg).startswith("We are being rate limited.") or len(record.args or ()) != 3:
+            return
+        _, url, retry_after = record.args
+        routes = _ROUTE_RE.findall(str(url).split("?", 1)[0])
+        # /channels/{id}/webhooks is a webhook call; /guilds/{id}/members/{id}/roles/{id} a member one
+        route = "webhooks" if "webhooks" in routes else (routes[0] if routes else "other")
+        self.histogram.observe(float(retry_after), route=route)
+
+
+_rate_limit_handler = None
+
+
+def watch_discord_rate_limits():
+    global _rate_limit_handler
+    if _rate_limit_handler is None:
+        _rate_limit_handler = RateLimitLogHandler()
+        logging.getLogger("discord.http").addHandler(_rate_limit_handler)
+
+
+def start_loop_monitor():
+    _monitor.start()
+
+
+async def metrics_handler(request):
+    return web.Response(body=REGISTRY.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+class MetricsServer:
+    """Standalone /metrics endpoint for bots that don't run the dashboard"""
+
+    def __init__(self, host='0.0.0.0', port=9108):
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get('/metrics', metrics_handler)
+        self.runner = None
+
+    async def start(self):
+        if self.runner is not None:
+            return
+        start_loop_monitor()
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,260 @@
+from collections import defaultdict
+
+import discord
+
+from blackup.capture import forum_tag_record, overwrite_records
+
+KINDS = ("create", "edit", "move", "delete")
+
+CHANNEL_FIELDS = {
+    "text": ("topic", "slowmode_delay", "nsfw"),
+    "news": ("topic", "slowmode_delay", "nsfw"),
+    "voice": ("bitrate", "user_limit", "rtc_region"),
+    "stage_voice": ("bitrate", "user_limit", "rtc_region", "topic"),
+    "forum": ("topic", "slowmode_delay", "nsfw", "default_thread_slowmode_delay",
+              "default_auto_archive_duration", "available_tags"),
+}
+
+# Channel types the restore knows how to create
+CREATABLE_CHANNELS = ("text", "news", "voice", "stage_voice", "forum")
+
+
+class PlanOp:
+    """One API mutation the restore needs to make"""
+
+    def __init__(self, kind, section, record=None, target=None, changes=None):
+        self.kind = kind
+        self.section = section
+        self.record = record
+        self.target = target
+        self.changes = changes or {}
+
+    @property
+    def key(self):
+        if self.record is not None:
+            return f"{self.section}:{self.record['id']}"
+        return f"{self.section}:live:{self.target.id}"
+
+    @property
+    def name(self):
+        return self.record["name"] if self.record is not None else self.target.name
+
+    def describe(self):
+        noun = {"roles": "role", "categories": "category", "channels": "channel", "emojis": "emoji"}[self.section]
+        text = f"{self.kind} {noun} '{self.name}'"
+        if self.kind == "edit" and self.changes:
+            text += f" ({', '.join(sorted(self.changes))})"
+        return text
+
+
+class RestorePlan:
+    """Minimal set of changes that brings a guild back in line with a backup"""
+
+    def __init__(self, backup_data):
+        self.backup_data = backup_data
+        self.ops = []
+        # Backup ID -> live object for everything that already exists
+        self.role_map = {}
+        self.category_map = {}
+        self.channel_map = {}
+        # "roles" and/or "channels" when their order differs from the backup
+        self.reorder = set()
+
+    def add(self, op):
+        self.ops.append(op)
+
+    def counts(self):
+        counts = {kind: 0 for kind in KINDS}
+        for op in self.ops:
+            counts[op.kind] += 1
+        return counts
+
+    def __len__(self):
+        return len(self.ops)
+
+
+def _match(records, live, same_kind=None, id_map=None):
+    """Pair backup records with live objects by stored ID first, then by name.
+
+    ``id_map`` (backup ID -> live ID, from a restore journal) takes
+    precedence over the stored ID, so objects an interrupted restore
+    created are found even if they've been renamed since.
+    Returns (matched pairs, unmatched records, unmatched live objects).
+    """
+    id_map = id_map or {}
+    by_id = {str(obj.id): obj for obj in live}
+    by_name = defaultdict(list)
+    for obj in live:
+        by_name[obj.name].append(obj)
+
+    used = set()
+    matched = []
+    unmatched = []
+    for record in records:
+        obj = by_id.get(id_map.get(record["id"], record["id"]))
+        if obj is None or obj.id in used:
+            obj = by_id.get(record["id"])
+        if obj is not None and obj.id not in used and (same_kind is None or same_kind(record, obj)):
+            used.add(obj.id)
+            matched.append((record, obj))
+        else:
+            unmatched.append(record)
+
+    # A renamed or recreated object keeps its name, so fall back to that
+    leftover = []
+    for record in unmatched:
+        obj = next(
+            (o for o in by_name.get(record["name"], ())
+             if o.id not in used and (same_kind is None or same_kind(record, o))),
+            None
+        )
+        if obj is not None:
+            used.add(obj.id)
+            matched.append((record, obj))
+        else:
+            leftover.append(record)
+
+    return matched, leftover, [obj for obj in live if obj.id not in used]
+
+
+def _field_value(channel, field):
+    if field == "available_tags":
+        return [forum_tag_record(tag) for tag in channel.available_tags]
+    return getattr(channel, field, None)
+
+
+def _order_differs(records, live_map):
+    """Whether live objects sort differently from the backup by position"""
+    pairs = [(record, live_map[record["id"]]) for record in records if record["id"] in live_map]
+    by_record = [obj.id for _, obj in sorted(pairs, key=lambda p: p[0]["position"])]
+    by_live = [obj.id for _, obj in sorted(pairs, key=lambda p: p[1].position)]
+    return by_record != by_live
+
+
+def _overwrite_key(overwrites_data, role_map):
+    """Normalise overwrites so backup and live sets compare by live IDs"""
+    key = set()
+    for o in overwrites_data:
+        target_id = o["target_id"]
+        if o["target_type"] == "role" and target_id in role_map:
+            target_id = str(role_map[target_id].id)
+        key.add((o["target_type"], target_id, o["allow"], o["deny"]))
+    return key
+
+
+def _overwrites_changed(record, obj, role_map):
+    return _overwrite_key(record["overwrites"], role_map) != _overwrite_key(overwrite_records(obj.overwrites), {})
+
+
+def plan_changes(guild, backup_data, prune=False, id_map=None):
+    """Diff backup_data against the live guild and return a RestorePlan.
+
+    Objects are matched by their stored ID, then by name. Anything matched
+    is only edited when a field actually drifted. Objects in the guild but
+    not in the backup are deleted only when ``prune`` is set. Pass the
+    ``id_map`` of an interrupted restore's journal to resume it.
+    """
+    plan = RestorePlan(backup_data)
+
+    # @everyone is never backed up, but overwrites still point at it
+    server_id = backup_data.get("server_info", {}).get("id")
+    if server_id:
+        plan.role_map[server_id] = guild.default_role
+
+    # Roles. Managed roles (bot, booster and integration roles) belong to their
+    # integration: they are matched so nothing duplicates them, but never
+    # created, edited or deleted
+    live_roles = [role for role in guild.roles if not role.is_default()]
+    matched, missing, extra = _match(backup_data["roles"], live_roles, id_map=id_map)
+    for record, role in matched:
+        plan.role_map[record["id"]] = role
+        if role.managed:
+            continue
+        changes = {}
+        if role.name != record["name"]:
+            changes["name"] = record["name"]
+        if role.color.value != record["color"]:
+            changes["color"] = discord.Color(record["color"])
+        if role.hoist != record["hoist"]:
+            changes["hoist"] = record["hoist"]
+        if role.mentionable != record["mentionable"]:
+            changes["mentionable"] = record["mentionable"]
+        if role.permissions.value != record["permissions"]:
+            changes["permissions"] = discord.Permissions(record["permissions"])
+        if changes:
+            plan.add(PlanOp("edit", "roles", record, role, changes))
+    # Backups from before "managed" was recorded can't tell; those records are created as before
+    missing = [record for record in missing if not record.get("managed")]
+    for record in missing:
+        plan.add(PlanOp("create", "roles", record))
+    extra = [role for role in extra if not role.managed]
+    if missing or _order_differs(backup_data["roles"], plan.role_map):
+        plan.reorder.add("roles")
+
+    # Categories
+    matched, missing, extra_categories = _match(backup_data["categories"], guild.categories, id_map=id_map)
+    for record, category in matched:
+        plan.category_map[record["id"]] = category
+        changes = {}
+        if category.name != record["name"]:
+            changes["name"] = record["name"]
+        if _overwrites_changed(record, category, plan.role_map):
+            changes["overwrites"] = record["overwrites"]
+        if changes:
+            plan.add(PlanOp("edit", "categories", record, category, changes))
+    for record in missing:
+        plan.add(PlanOp("create", "categories", record))
+
+    # Channels
+    live_channels = [ch for ch in guild.channels if not isinstance(ch, discord.CategoryChannel)]
+    same_type = lambda record, channel: str(channel.type) == record["type"]
+    matched, missing, extra_channels = _match(backup_data["channels"], live_channels, same_type, id_map)
+    for record, channel in matched:
+        plan.channel_map[record["id"]] = channel
+        changes = {}
+        if channel.name != record["name"]:
+            changes["name"] = record["name"]
+        for field in CHANNEL_FIELDS.get(record["type"], ()):
+            if field in record and _field_value(channel, field) != record[field]:
+                changes[field] = record[field]
+        if _overwrites_changed(record, channel, plan.role_map):
+            changes["overwrites"] = record["overwrites"]
+
+        current_category = str(channel.category.id) if channel.category else None
+        wanted = plan.category_map.get(record["category_id"])
+        moved = (
+            (record["category_id"] is None and current_category is not None)
+            or (record["category_id"] is not None and (wanted is None or str(wanted.id) != current_category))
+        )
+        if moved:
+            changes["category"] = record["category_id"]
+
+        if set(changes) == {"category"}:
+            plan.add(PlanOp("move", "channels", record, channel, changes))
+        elif changes:
+            plan.add(PlanOp("edit", "channels", record, channel, changes))
+    created = [record for record in missing if record["type"] in CREATABLE_CHANNELS]
+    for record in created:
+        plan.add(PlanOp("create", "channels", record))
+    if (any(op.kind == "create" and op.section == "categories" for op in plan.ops) or created
+            or _order_differs(backup_data["categories"], plan.category_map)
+            or _order_differs(backup_data["channels"], plan.channel_map)):
+        plan.reorder.add("channels")
+
+    # Emojis are recreated from the asset store; extra ones are left alone
+    matched, missing, _ = _match(backup_data.get("emojis", []), guild.emojis, id_map=id_map)
+    for record, emoji in matched:
+        if emoji.name != record["name"]:
+            plan.add(PlanOp("edit", "emojis", record, emoji, {"name": record["name"]}))
+    for record in missing:
+        plan.add(PlanOp("create", "emojis", record))
+
+    if prune:
+        for channel in extra_channels:
+            plan.add(PlanOp("delete", "channels", target=channel))
+        for category in extra_categories:
+            plan.add(PlanOp("delete", "categories", target=category))
+        for role in extra:
+            plan.add(PlanOp("delete", "roles", target=role))
+
+    return plan
@@ -0,0 +1,511 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+
+import discord
+
+from blackup.assets import get_asset_store
+from blackup.governor import INTERACTIVE, get_governor
+from blackup.metrics import RATE_LIMIT_WAIT, RESTORE_API_CALLS, RESTORE_PHASE_DURATION
+from blackup.planner import KINDS
+
+# Extra client-side per-route limits (calls per window in seconds). None by
+# default: discord.py reads every bucket's X-RateLimit headers, sleeps
+# before a bucket runs dry and retries the odd 429, so guessed limits here
+# only slowed restores down. The governor still covers the global limit.
+DEFAULT_ROUTE_LIMITS = {}
+
+PHASES = ("roles", "categories", "channels", "emojis", "positions", "members")
+
+
+class RouteBuckets:
+    """Sliding-window limiter with one bucket per API route"""
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        self.limits = dict(DEFAULT_ROUTE_LIMITS if limits is None else limits)
+        self.clock = clock
+        self.calls = defaultdict(deque)
+        self.locks = defaultdict(asyncio.Lock)
+        self.wait_time = 0.0
+
+    async def acquire(self, route):
+        if route not in self.limits:
+            return
+        rate, per = self.limits[route]
+        # One waiter per bucket at a time so the window is checked in order
+        async with self.locks[route]:
+            calls = self.calls[route]
+            while True:
+                now = self.clock()
+                while calls and now - calls[0] >= per:
+                    calls.popleft()
+                if len(calls) < rate:
+                    calls.append(now)
+                    return
+                delay = per - (now - calls[0])
+                self.wait_time += delay
+                RATE_LIMIT_WAIT.observe(delay, route=route)
+                await asyncio.sleep(delay)
+
+
+class RestoreTask:
+    """A single API mutation in the restore graph"""
+
+    def __init__(self, key, phase, route, label, factory, depends_on=()):
+        self.key = key
+        self.phase = phase
+        self.route = route
+        self.label = label
+        self.factory = factory
+        self.depends_on = [dep for dep in depends_on if dep != key]
+
+
+class RestoreScheduler:
+    """Runs restore tasks concurrently while respecting their dependencies.
+
+    Each task's factory is called with the results of the tasks it depends
+    on, so a channel gets the category object created for it. A failed task
+    does not block its dependents; they run with ``None`` for that result.
+    Calls also draw from the process-wide ``governor`` so concurrent jobs
+    share the API budget, and each finished task is logged to ``journal``
+    when one is given.
+    """
+
+    def __init__(self, workers=8, buckets=None, clock=time.monotonic, governor=None,
+                 guild_id=None, priority=INTERACTIVE, journal=None):
+        self.workers = workers
+        self.buckets = buckets or RouteBuckets(clock=clock)
+        self.clock = clock
+        self.governor = governor or get_governor()
+        self.guild_id = guild_id
+        self.priority = priority
+        self.journal = journal
+        self.tasks = {}
+        self.completed = 0
+        self.governor_wait = 0.0
+        # Clock time run() began; None while the job still waits for its shard
+        self.started = None
+
+    def add(self, task):
+        self.tasks[task.key] = task
+
+    async def run(self):
+        self.started = self.clock()
+        results = {}
+        errors = []
+        phase_start = {}
+        phase_end = {}
+
+        # Dependencies on tasks that aren't in the graph are already satisfied
+        pending = {}
+        dependents = defaultdict(list)
+        for task in self.tasks.values():
+            deps = [dep for dep in task.depends_on if dep in self.tasks]
+            pending[task.key] = len(deps)
+            for dep in deps:
+                dependents[dep].append(task.key)
+
+        ready = asyncio.Queue()
+        for key, count in pending.items():
+            if count == 0:
+                ready.put_nowait(key)
+        remaining = len(self.tasks)
+        done = asyncio.Event()
+        if remaining == 0:
+            done.set()
+
+        async def worker():
+            nonlocal remaining
+            while True:
+                key = await ready.get()
+                task = self.tasks[key]
+                phase_start.setdefault(task.phase, self.clock())
+                try:
+                    await self.buckets.acquire(task.route)
+                    # Route first, so a global token is never held while a route bucket waits
+                    waited = self.clock()
+                    await self.governor.acquire(self.guild_id, self.priority)
+                    self.governor_wait += self.clock() - waited
+                    deps = {dep: results.get(dep) for dep in task.depends_on}
+                    results[key] = await task.factory(deps)
+                except Exception as e:
+                    results[key] = None
+                    errors.append(f"{task.label}: {str(e)}")
+                finally:
+                    self.completed += 1
+                    if self.journal is not None:
+                        self.journal.task_done(key, results.get(key))
+                    phase_end[task.phase] = self.clock()
+                    for child in dependents[key]:
+                        pending[child] -= 1
+                        if pending[child] == 0:
+                            ready.put_nowait(child)
+                    remaining -= 1
+                    if remaining == 0:
+                        done.set()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, self.workers))]
+        try:
+            await done.wait()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        timings = {
+            phase: phase_end[phase] - phase_start[phase]
+            for phase in phase_start
+        }
+        for phase, duration in timings.items():
+            RESTORE_PHASE_DURATION.observe(duration, phase=phase)
+        # Every task is exactly one API mutation
+        RESTORE_API_CALLS.observe(len(self.tasks))
+        return results, errors, timings
+
+
+class OverwriteResolver:
+    """Turns backup overwrite entries into live targets with dict lookups.
+
+    Built once per restore. ``role_map`` is the plan's backup ID -> role
+    mapping, which role creates add to as they finish, so overwrites that
+    point at a recreated role follow it to its new ID. Identical allow/deny
+    pairs share one PermissionOverwrite.
+    """
+
+    def __init__(self, guild, role_map):
+        self.guild = guild
+        self.role_map = role_map
+        self.roles = {str(role.id): role for role in guild.roles}
+        self.pairs = {}
+
+    def target(self, overwrite_data):
+        target_id = overwrite_data["target_id"]
+        if overwrite_data["target_type"] == "role":
+            return self.role_map.get(target_id) or self.roles.get(target_id)
+        # Members who left or aren't cached still keep their overwrite; dropping
+        # it would leave the channel drifting from the backup on every restore
+        member_id = int(target_id)
+        return self.guild.get_member(member_id) or discord.Object(member_id, type=discord.Member)
+
+    def permission_overwrite(self, allow, deny):
+        key = (allow, deny)
+        if key not in self.pairs:
+            self.pairs[key] = discord.PermissionOverwrite.from_pair(
+                discord.Permissions(allow),
+                discord.Permissions(deny)
+            )
+        return self.pairs[key]
+
+    def build(self, overwrites_data):
+        overwrites = {}
+        for overwrite_data in overwrites_data:
+            target = self.target(overwrite_data)
+            if target:
+                overwrites[target] = self.permission_overwrite(overwrite_data["allow"], overwrite_data["deny"])
+        return overwrites
+
+
+def _role_deps(overwrites_data):
+    return [
+        f"roles:{o['target_id']}" for o in overwrites_data
+        if o["target_type"] == "role"
+    ]
+
+
+def _route(op):
+    return op.section if op.section in ("roles", "emojis") else "channels"
+
+
+def _role_factory(guild, plan, resolver, op):
+    record = op.record
+
+    async def create(deps):
+        role = await guild.create_role(
+            name=record["name"],
+            color=discord.Color(record["color"]),
+            hoist=record["hoist"],
+            mentionable=record["mentionable"],
+            permissions=discord.Permissions(record["permissions"])
+        )
+        # Overwrites that pointed at the old role now resolve to this one
+        plan.role_map[record["id"]] = role
+        return role
+
+    async def edit(deps):
+        await op.target.edit(**op.changes)
+        return op.target
+
+    return create if op.kind == "create" else edit
+
+
+def _category_factory(guild, plan, resolver, op):
+    record = op.record
+
+    async def create(deps):
+        category = await guild.create_category(
+            name=record["name"],
+            overwrites=resolver.build(record["overwrites"])
+        )
+        plan.category_map[record["id"]] = category
+        return category
+
+    async def edit(deps):
+        changes = dict(op.changes)
+        if "overwrites" in changes:
+            changes["overwrites"] = resolver.build(changes["overwrites"])
+        await op.target.edit(**changes)
+        return op.target
+
+    return create if op.kind == "create" else edit
+
+
+def _forum_tags(tags):
+    return [
+        discord.ForumTag(name=tag["name"], emoji=tag["emoji"], moderated=tag["moderated"])
+        for tag in tags
+    ]
+
+
+def _channel_factory(guild, plan, resolver, op):
+    record = op.record
+    category_key = f"categories:{record['category_id']}"
+
+    def category(deps):
+        if record["category_id"] is None:
+            return None
+        return deps.get(category_key) or plan.category_map.get(record["category_id"])
+
+    async def create(deps):
+        fields = {
+            "name": record["name"],
+            "category": category(deps),
+            "overwrites": resolver.build(record["overwrites"])
+        }
+        kind = record["type"]
+        if kind in ("text", "news", "forum"):
+            fields.update(
+                topic=record.get("topic") or "",
+                slowmode_delay=record.get("slowmode_delay", 0),
+                nsfw=record.get("nsfw", False)
+            )
+        if kind in ("voice", "stage_voice"):
+            fields.update(
+                bitrate=record.get("bitrate", 64000),
+                user_limit=record.get("user_limit", 0),
+                rtc_region=record.get("rtc_region")
+            )
+
+        if kind == "forum":
+            channel = await guild.create_forum(
+                available_tags=_forum_tags(record.get("available_tags", [])),
+                default_thread_slowmode_delay=record.get("default_thread_slowmode_delay", 0),
+                default_auto_archive_duration=record.get("default_auto_archive_duration", 1440),
+                **fields
+            )
+        elif kind == "stage_voice":
+            channel = await guild.create_stage_channel(**fields)
+        elif kind == "voice":
+            channel = await guild.create_voice_channel(**fields)
+        else:
+            channel = await guild.create_text_channel(news=kind == "news", **fields)
+        plan.channel_map[record["id"]] = channel
+        return channel
+
+    async def edit(deps):
+        changes = dict(op.changes)
+        if "overwrites" in changes:
+            changes["overwrites"] = resolver.build(changes["overwrites"])
+        if "available_tags" in changes:
+            changes["available_tags"] = _forum_tags(changes["available_tags"])
+        if "category" in changes:
+            changes["category"] = category(deps)
+        await op.target.edit(**changes)
+        return op.target
+
+    return create if op.kind == "create" else edit
+
+
+def _emoji_factory(guild, plan, resolver, op):
+    record = op.record
+
+    async def create(deps):
+        store = get_asset_store()
+        digest = record.get("asset")
+        if not digest or not store.has(digest):
+            # Older backups only have the URL, which works while the CDN still serves it
+            digest, _ = await store.fetch(record["url"])
+        image = await asyncio.get_running_loop().run_in_executor(None, store.read, digest)
+        return await guild.create_custom_emoji(name=record["name"], image=image)
+
+    async def edit(deps):
+        await op.target.edit(**op.changes)
+        return op.target
+
+    return create if op.kind == "create" else edit
+
+
+FACTORIES = {
+    "roles": _role_factory,
+    "categories": _category_factory,
+    "channels": _channel_factory,
+    "emojis": _emoji_factory,
+}
+
+
+def _reorder_roles(guild, plan):
+    """One bulk call that puts every role the bot can move back in backup order"""
+
+    async def reorder(deps):
+        top = guild.me.top_role if guild.me else None
+        records = sorted(plan.backup_data["roles"], key=lambda r: r["position"])
+        roles = [plan.role_map.get(record["id"]) for record in records]
+        roles = [role for role in roles if role is not None and (top is None or role < top)]
+        # Positions count up from @everyone at 0
+        positions = {role: index + 1 for index, role in enumerate(roles)}
+        if positions:
+            await guild.edit_role_positions(positions, reason="Blackup restore")
+        return positions
+
+    return reorder
+
+
+def _reorder_channels(guild, plan):
+    """One bulk call that restores every category's and channel's position and parent"""
+
+    async def reorder(deps):
+        payload = []
+        for record in plan.backup_data["categories"]:
+            category = plan.category_map.get(record["id"])
+            if category is not None:
+                payload.append({"id": category.id, "position": record["position"]})
+        for record in plan.backup_data["channels"]:
+            channel = plan.channel_map.get(record["id"])
+            if channel is None:
+                continue
+            parent = plan.category_map.get(record["category_id"]) if record["category_id"] else None
+            payload.append({
+                "id": channel.id,
+                "position": record["position"],
+                "parent_id": parent.id if parent else None,
+                "lock_permissions": False
+            })
+        if payload:
+            # discord.py only exposes per-channel moves, so use the bulk endpoint directly
+            await guild._state.http.bulk_channel_update(guild.id, payload, reason="Blackup restore")
+        return payload
+
+    return reorder
+
+
+def _member_tasks(guild, plan, member_roles, creating):
+    """Role re-assignments from a member snapshot, members missing the most roles first"""
+    pending = []
+    for member_id, role_ids in member_roles.assignments().items():
+        member = guild.get_member(member_id)
+        if member is None:
+            continue
+        current = {role.id for role in member.roles}
+        missing = []
+        for role_id in map(str, role_ids):
+            role = plan.role_map.get(role_id)
+            if role is None:
+                # Deleted roles come back only if this restore recreates them
+                if f"roles:{role_id}" in creating:
+                    missing.append(role_id)
+            elif role.id not in current and role.is_assignable():
+                missing.append(role_id)
+        if missing:
+            pending.append((member, missing))
+    pending.sort(key=lambda item: len(item[1]), reverse=True)
+
+    for member, missing in pending:
+        async def assign(deps, member=member, missing=missing):
+            roles = [plan.role_map[role_id] for role_id in missing if role_id in plan.role_map]
+            if not roles:
+                # Every role it needed failed to create; None keeps the member out of the count
+                return None
+            # One member edit adds every role at once
+            await member.add_roles(*roles, reason="Blackup restore", atomic=False)
+            return member
+
+        yield RestoreTask(
+            f"members:{member.id}", "members", "members",
+            f"assign {len(missing)} role(s) to '{member.display_name}'",
+            assign, [f"roles:{role_id}" for role_id in missing]
+        )
+
+
+def schedule_plan(guild, plan, workers=8, buckets=None, member_roles=None, governor=None, priority=INTERACTIVE,
+                  journal=None):
+    """Build a scheduler that executes every op in a RestorePlan.
+
+    With a ``member_roles`` snapshot, members also get back the roles they
+    held, each after the roles it needs have been created.
+    """
+    scheduler = RestoreScheduler(workers=workers, buckets=buckets, governor=governor,
+                                 guild_id=guild.id, priority=priority, journal=journal)
+    resolver = OverwriteResolver(guild, plan.role_map)
+    channel_keys = []
+
+    for op in plan.ops:
+        if op.kind == "delete":
+            continue
+
+        depends_on = []
+        if op.section in ("categories", "channels"):
+            overwrites = op.record["overwrites"] if op.kind == "create" else op.changes.get("overwrites", [])
+            depends_on += _role_deps(overwrites)
+        if op.section == "channels":
+            channel_keys.append(op.key)
+            if op.record["category_id"]:
+                depends_on.append(f"categories:{op.record['category_id']}")
+
+        scheduler.add(RestoreTask(
+            op.key, op.section, _route(op), op.describe(),
+            FACTORIES[op.section](guild, plan, resolver, op), depends_on
+        ))
+
+    # Deletes go last so channels are moved out of a category before it goes
+    for op in plan.ops:
+        if op.kind != "delete":
+            continue
+
+        async def delete(deps, target=op.target):
+            await target.delete()
+            return target
+
+        depends_on = channel_keys if op.section == "categories" else []
+        scheduler.add(RestoreTask(op.key, op.section, _route(op), op.describe(), delete, depends_on))
+
+    # Positions are fixed in bulk once everything they cover exists
+    if "roles" in plan.reorder:
+        role_keys = [key for key, task in scheduler.tasks.items() if task.phase == "roles"]
+        scheduler.add(RestoreTask(
+            "positions:roles", "positions", "roles", "reorder roles",
+            _reorder_roles(guild, plan), role_keys
+        ))
+    if "channels" in plan.reorder:
+        layout_keys = [key for key, task in scheduler.tasks.items() if task.phase in ("categories", "channels")]
+        scheduler.add(RestoreTask(
+            "positions:channels", "positions", "channels", "reorder channels",
+            _reorder_channels(guild, plan), layout_keys
+        ))
+
+    if member_roles is not None:
+        creating = {op.key for op in plan.ops if op.section == "roles" and op.kind == "create"}
+        for task in _member_tasks(guild, plan, member_roles, creating):
+            scheduler.add(task)
+
+    return scheduler
+
+
+def count_member_updates(results):
+    return sum(1 for key, result in results.items() if key.startswith("members:") and result is not None)
+
+
+def count_applied(plan, results):
+    applied = {kind: 0 for kind in KINDS}
+    for op in plan.ops:
+        if results.get(op.key) is not None:
+            applied[op.kind] += 1
+    return applied
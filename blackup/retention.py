@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import zipfile
+from collections import Counter
+from datetime import datetime
+
+from blackup import compact
+from blackup.catalog import get_catalog
+from blackup.formats import list_backup_files, load_backup
+from blackup.members import member_snapshot_path
+from blackup.snapshots import get_store, is_manifest, read_backup_json
+
+RETENTION_FILE = "backups/retention.json"
+ARCHIVE_DIR = "archives"
+
+
+class RetentionPolicy:
+    """Which backups to keep for one guild.
+
+    The newest ``keep_last`` backups are always kept, plus the newest backup
+    in each of the last ``hourly`` hours, ``daily`` days and ``weekly``
+    weeks. ``max_bytes`` then drops the oldest survivors until the guild
+    fits. Everything else is deleted, or folded into a per-month archive
+    when ``archive`` is set.
+    """
+
+    def __init__(self, keep_last=10, hourly=0, daily=0, weekly=0, max_bytes=None, archive=False):
+        if keep_last < 1:
+            raise ValueError("Retention must keep at least the latest backup")
+        self.keep_last = keep_last
+        self.hourly = hourly
+        self.daily = daily
+        self.weekly = weekly
+        self.max_bytes = max_bytes
+        self.archive = archive
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    def describe(self):
+        parts = [f"last {self.keep_last}"]
+        for label, count in (("hourly", self.hourly), ("daily", self.daily), ("weekly", self.weekly)):
+            if count:
+                parts.append(f"{count} {label}")
+        if self.max_bytes:
+            parts.append(f"max {self.max_bytes / 1024 / 1024:g}MB")
+        if self.archive:
+            parts.append("archive old backups")
+        return ", ".join(parts)
+
+    def select(self, backups, objects=None):
+        """Split (path, taken_at, size) entries into (keep, drop) lists.
+
+        ``objects`` maps an incremental backup's path to {digest: size} for
+        the snapshot objects it refers to, so ``max_bytes`` counts them too.
+        """
+        objects = objects or {}
+        backups = sorted(backups, key=lambda b: b[1], reverse=True)
+        keep = set(b[0] for b in backups[:self.keep_last])
+
+        buckets = (
+            (self.hourly, lambda t: (t.date(), t.hour)),
+            (self.daily, lambda t: t.date()),
+            (self.weekly, lambda t: t.isocalendar()[:2]),
+        )
+        for count, bucket_of in buckets:
+            seen = []
+            for path, taken_at, _ in backups:
+                bucket = bucket_of(taken_at)
+                if bucket in seen:
+                    continue
+                if len(seen) >= count:
+                    break
+                seen.append(bucket)
+                keep.add(path)
+
+        if self.max_bytes:
+            kept = [b for b in backups if b[0] in keep]
+            # An object shared by several backups only frees space once the last of them goes
+            users = Counter(digest for b in kept for digest in objects.get(b[0], ()))
+            sizes = {digest: size for refs in objects.values() for digest, size in refs.items()}
+            total = sum(b[2] for b in kept) + sum(sizes[digest] for digest in users)
+            # Oldest go first, but the newest backup always survives
+            for path, _, size in reversed(kept[1:]):
+                if total <= self.max_bytes:
+                    break
+                keep.discard(path)
+                total -= size
+                for digest in objects.get(path, ()):
+                    users[digest] -= 1
+                    if not users[digest]:
+                        total -= sizes[digest]
+
+        return [b for b in backups if b[0] in keep], [b for b in backups if b[0] not in keep]
+
+
+class RetentionReport:
+    def __init__(self):
+        self.deleted = 0
+        self.archived = 0
+        self.reclaimed_bytes = 0
+
+    def merge(self, other):
+        self.deleted += other.deleted
+        self.archived += other.archived
+        self.reclaimed_bytes += other.reclaimed_bytes
+
+
+def _archive_path(server_dir, taken_at):
+    return os.path.join(server_dir, ARCHIVE_DIR, f"{taken_at.strftime('%Y-%m')}.zip")
+
+
+def _process_batch(catalog, guild_id, server_dir, batch, archive):
+    """Delete or archive one batch of backups. Runs in an executor."""
+    report = RetentionReport()
+    for path, taken_at, size in batch:
+        sidecar = member_snapshot_path(path)
+        if archive:
+            # Archives hold self-contained compact copies, so they don't
+            # depend on snapshot objects that may be collected later
+            archive_path = _archive_path(server_dir, taken_at)
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            before = os.path.getsize(archive_path) if os.path.exists(archive_path) else 0
+            name = os.path.splitext(os.path.basename(path))[0] + compact.EXTENSION
+            with zipfile.ZipFile(archive_path, "a", compression=zipfile.ZIP_STORED) as zf:
+                if name not in zf.namelist():
+                    zf.writestr(name, compact.encode(load_backup(path)))
+                if os.path.exists(sidecar) and os.path.basename(sidecar) not in zf.namelist():
+                    zf.write(sidecar, os.path.basename(sidecar))
+            size -= os.path.getsize(archive_path) - before
+            report.archived += 1
+        else:
+            report.deleted += 1
+        if os.path.exists(sidecar):
+            size += os.path.getsize(sidecar)
+            os.remove(sidecar)
+        os.remove(path)
+        catalog.remove(guild_id, [path])
+        report.reclaimed_bytes += size
+    return report
+
+
+def _manifest_hashes(path):
+    """Snapshot objects an incremental backup refers to; empty for other formats"""
+    if path.endswith(compact.EXTENSION):
+        return []
+    data = read_backup_json(path)
+    if not is_manifest(data):
+        return []
+    return [digest for hashes in data.values() if isinstance(hashes, list) for digest in hashes]
+
+
+def _manifest_objects(server_dir, paths):
+    """{path: {digest: size}} for the incremental backups among paths"""
+    store = get_store(server_dir)
+    objects = {}
+    for path in paths:
+        refs = {}
+        for digest in _manifest_hashes(path):
+            object_path = store.object_path(digest)
+            refs[digest] = os.path.getsize(object_path) if os.path.exists(object_path) else 0
+        if refs:
+            objects[path] = refs
+    return objects
+
+
+def _collect_snapshot_objects(server_dir):
+    """Drop snapshot objects no manifest in server_dir refers to"""
+    store = get_store(server_dir)
+    if not os.path.isdir(store.objects_dir):
+        return 0
+
+    # Manifests are re-read under the store lock rather than taken from the
+    # retention scan, so a backup written since then keeps its new objects
+    with store.lock:
+        referenced = set()
+        for name in list_backup_files(server_dir):
+            referenced.update(_manifest_hashes(os.path.join(server_dir, name)))
+
+        reclaimed = 0
+        for root, _, files in os.walk(store.objects_dir):
+            for name in files:
+                digest = name.split(".")[0]
+                if digest not in referenced:
+                    path = os.path.join(root, name)
+                    reclaimed += os.path.getsize(path)
+                    os.remove(path)
+                    store.known.discard(digest)
+    return reclaimed
+
+
+class RetentionEngine:
+    """Applies per-guild retention policies in the background.
+
+    Work is done in batches in the default executor so a large backlog of
+    old backups never blocks the event loop. ``catalog`` is the one indexing
+    the backups, the shared catalog unless given.
+    """
+
+    def __init__(self, path=RETENTION_FILE, batch_size=25, interval=3600, owns=None, catalog=None):
+        self.path = path
+        self.catalog = catalog
+        # Guilds this process enforces when shard processes share the policy file
+        self.owns = owns or (lambda guild_id: True)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.policies = {}
+        self.locks = {}
+        self.task = None
+        self.total_reclaimed = 0
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self):
+        self.policies = {
+            guild_id: RetentionPolicy(**policy)
+            for guild_id, policy in self._read().items()
+            if self.owns(guild_id)
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        policies = {g: p for g, p in self._read().items() if not self.owns(g)}
+        policies.update({g: p.to_dict() for g, p in self.policies.items()})
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(policies, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, guild_id):
+        return self.policies.get(str(guild_id))
+
+    def set(self, guild_id, policy):
+        self.policies[str(guild_id)] = policy
+        self.save()
+
+    def remove(self, guild_id):
+        removed = self.policies.pop(str(guild_id), None)
+        if removed:
+            self.save()
+        return removed
+
+    async def apply(self, guild_id, server_dir):
+        """Enforce the guild's policy now and return a RetentionReport"""
+        report = RetentionReport()
+        policy = self.get(guild_id)
+        if policy is None:
+            return report
+
+        lock = self.locks.setdefault(str(guild_id), asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            catalog = self.catalog or get_catalog()
+
+            def scan():
+                catalog.sync(guild_id, server_dir)
+                backups = [
+                    (os.path.join(server_dir, entry.filename), datetime.fromtimestamp(entry.created_at), entry.size)
+                    for entry in catalog.list(guild_id)
+                ]
+                # The catalog only sizes manifests; their objects count towards max_bytes too
+                objects = _manifest_objects(server_dir, [b[0] for b in backups]) if policy.max_bytes else None
+                return backups, objects
+
+            keep, drop = policy.select(*await loop.run_in_executor(None, scan))
+            for i in range(0, len(drop), self.batch_size):
+                batch = drop[i:i + self.batch_size]
+                report.merge(await loop.run_in_executor(
+                    None, _process_batch, catalog, guild_id, server_dir, batch, policy.archive
+                ))
+
+            if drop:
+                report.reclaimed_bytes += await loop.run_in_executor(None, _collect_snapshot_objects, server_dir)
+
+        self.total_reclaimed += report.reclaimed_bytes
+        return report
+
+    def start(self, server_dir_for):
+        """Periodically apply every policy; server_dir_for maps guild ID to its directory"""
+        if self.task is None:
+            self.load()
+            self.task = asyncio.create_task(self._run(server_dir_for))
+
+    async def _run(self, server_dir_for):
+        while True:
+            for guild_id in list(self.policies):
+                try:
+                    await self.apply(guild_id, server_dir_for(guild_id))
+                except Exception as e:
+                    print(f"Retention for {guild_id} failed: {e}")
+            await asyncio.sleep(self.interval)
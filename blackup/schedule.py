@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import json
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+SCHEDULES_FILE = "backups/schedules.json"
+
+# Cron jobs are pushed back by up to this many seconds
+CRON_JITTER = 300
+
+
+class CronSpec:
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Each field accepts ``*``, ``*/n``, ``a-b``, ``a-b/n`` and comma lists.
+    Day-of-week is 0-6 with 0 as Sunday.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron expressions need 5 fields: minute hour day month weekday")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.RANGES)
+        )
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for item in field.split(","):
+            step = 1
+            if "/" in item:
+                item, step = item.split("/")
+                step = int(step)
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(x) for x in item.split("-"))
+            else:
+                start = end = int(item)
+            if start < low or end > high or step < 1:
+                raise ValueError(f"Cron field '{field}' is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def next_after(self, dt):
+        """First matching minute strictly after dt"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if dt.day not in self.days or (dt.weekday() + 1) % 7 not in self.weekdays:
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class BackupSchedule:
+    def __init__(self, guild_id, interval=None, cron=None, backup_format="incremental",
+                 next_run=None, last_run=None, last_duration=None):
+        if (interval is None) == (cron is None):
+            raise ValueError("A schedule needs either an interval or a cron expression")
+        if interval is not None and interval < 60:
+            raise ValueError("Backup interval must be at least a minute")
+        self.guild_id = str(guild_id)
+        self.interval = interval
+        self.cron = cron
+        self.cron_spec = CronSpec(cron) if cron else None
+        self.backup_format = backup_format
+        self.next_run = next_run
+        self.last_run = last_run
+        self.last_duration = last_duration
+
+    def first_run(self, now):
+        if self.cron_spec:
+            return self.next_cron(now)
+        # Stable per-guild phase spreads guilds evenly over the interval
+        phase = zlib.crc32(self.guild_id.encode()) % int(self.interval)
+        base = now - (now % self.interval) + phase
+        return base if base > now else base + self.interval
+
+    def next_cron(self, now):
+        after = self.cron_spec.next_after(datetime.fromtimestamp(now)).timestamp()
+        return after + random.uniform(0, CRON_JITTER)
+
+    def following_run(self, scheduled, now):
+        if self.cron_spec:
+            return self.next_cron(now)
+        # Keep the guild's phase, skip runs missed while the bot was down,
+        # and add a little jitter so neighbouring guilds don't drift together
+        next_run = scheduled + self.interval
+        if next_run <= now:
+            next_run += ((now - next_run) // self.interval + 1) * self.interval
+        return next_run + random.uniform(0, min(60, self.interval * 0.05))
+
+    def describe(self):
+        if self.cron:
+            return f"cron `{self.cron}`"
+        hours = self.interval / 3600
+        return f"every {hours:g}h"
+
+    def to_dict(self):
+        return {
+            "guild_id": self.guild_id,
+            "interval": self.interval,
+            "cron": self.cron,
+            "backup_format": self.backup_format,
+            "next_run": self.next_run,
+            "last_run": self.last_run,
+            "last_duration": self.last_duration
+        }
+
+
+class BackupScheduler:
+    """In-process scheduler that runs per-guild backups on their own timers.
+
+    Due schedules are queued and picked up by a small pool of workers, so a
+    burst of due guilds never runs more than ``workers`` backups at once.
+    ``run_backup`` is an ``async (guild_id, backup_format)`` callable.
+    When several shard processes share the schedules file, ``owns`` says
+    which guilds this one runs; the others' entries are kept as on disk.
+    """
+
+    def __init__(self, run_backup, path=SCHEDULES_FILE, workers=2, clock=time.time, owns=None):
+        self.run_backup = run_backup
+        self.path = path
+        self.owns = owns or (lambda guild_id: True)
+        self.workers = workers
+        self.clock = clock
+        self.schedules = {}
+        self.heap = []
+        self.queue = asyncio.Queue()
+        self.wakeup = asyncio.Event()
+        self.tasks = []
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.runs = 0
+        self.failures = 0
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self):
+        for entry in self._read():
+            if self.owns(entry["guild_id"]):
+                schedule = BackupSchedule(**entry)
+                self.schedules[schedule.guild_id] = schedule
+        now = self.clock()
+        for schedule in self.schedules.values():
+            if schedule.next_run is None:
+                schedule.next_run = schedule.first_run(now)
+            self._push(schedule)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        entries = [entry for entry in self._read() if not self.owns(entry["guild_id"])]
+        entries += [s.to_dict() for s in self.schedules.values()]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _push(self, schedule):
+        heapq.heappush(self.heap, (schedule.next_run, schedule.guild_id))
+        self.wakeup.set()
+
+    def set(self, schedule):
+        schedule.next_run = schedule.first_run(self.clock())
+        self.schedules[schedule.guild_id] = schedule
+        self._push(schedule)
+        self.save()
+        return schedule
+
+    def remove(self, guild_id):
+        # Stale heap entries are skipped when they come up
+        removed = self.schedules.pop(str(guild_id), None)
+        if removed:
+            self.save()
+        return removed
+
+    def get(self, guild_id):
+        return self.schedules.get(str(guild_id))
+
+    def start(self):
+        if self.tasks:
+            return
+        self.load()
+        self.tasks.append(asyncio.create_task(self._dispatch()))
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _dispatch(self):
+        while True:
+            self.wakeup.clear()
+            now = self.clock()
+            while self.heap and self.heap[0][0] <= now:
+                due, guild_id = heapq.heappop(self.heap)
+                schedule = self.schedules.get(guild_id)
+                if schedule is None or schedule.next_run != due:
+                    continue
+                # Marks it queued, so a duplicate heap entry can't run it twice
+                schedule.next_run = None
+                self.queue.put_nowait((due, schedule))
+
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            due, schedule = await self.queue.get()
+            start = self.clock()
+            self.last_lag = start - due
+            self.max_lag = max(self.max_lag, self.last_lag)
+            try:
+                await self.run_backup(int(schedule.guild_id), schedule.backup_format)
+            except Exception as e:
+                self.failures += 1
+                print(f"Scheduled backup for {schedule.guild_id} failed: {e}")
+            finally:
+                self.runs += 1
+                schedule.last_run = start
+                schedule.last_duration = self.clock() - start
+                if self.schedules.get(schedule.guild_id) is schedule:
+                    schedule.next_run = schedule.following_run(due, self.clock())
+                    self._push(schedule)
+                    self.save()
+                self.queue.task_done()
+
+    def stats(self):
+        durations = [s.last_duration for s in self.schedules.values() if s.last_duration is not None]
+        return {
+            "scheduled": len(self.schedules),
+            "queue_depth": self.queue.qsize(),
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration_max": max(durations) if durations else None
+        }
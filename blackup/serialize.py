@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from blackup.integrity import AtomicWriter
+
+
+def _indent(text, prefix):
+    return "\n".join(prefix + line for line in text.split("\n"))
+
+
+class _ChunkWriter:
+    """Writes encoded chunks in an executor, keeping at most one write in flight"""
+
+    def __init__(self, f, loop):
+        self.f = f
+        self.loop = loop
+        self.pending = None
+        self.bytes_written = 0
+
+    async def write(self, text):
+        # The next chunk is built while the previous one is being written
+        await self.flush()
+        data = text.encode("utf-8")
+        self.bytes_written += len(data)
+        self.pending = self.loop.run_in_executor(None, self.f.write, data)
+
+    async def flush(self):
+        if self.pending is not None:
+            await self.pending
+            self.pending = None
+
+
+async def stream_backup(filename, server_info, sections, batch_size=100):
+    """Write a backup file section by section without building it in memory.
+
+    ``sections`` yields ``(name, records)`` pairs; records are walked on the
+    event loop, ``batch_size`` at a time, while the file I/O happens in the
+    default executor. The output is identical to
+    ``json.dump(backup_data, f, indent=2, ensure_ascii=False)`` plus a last
+    ``_blackup`` checksum key, and only appears under ``filename`` once complete.
+
+    Returns ``(record counts per section, bytes written)``.
+    """
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(None, AtomicWriter, filename)
+    writer = _ChunkWriter(f, loop)
+    counts = {}
+    committed = False
+    try:
+        info = _indent(json.dumps(server_info, indent=2, ensure_ascii=False), "  ").lstrip()
+        await writer.write('{\n  "server_info": ' + info)
+
+        for name, records in sections:
+            count = 0
+            batch = [f',\n  "{name}": [']
+            for record in records:
+                text = _indent(json.dumps(record, indent=2, ensure_ascii=False), "    ")
+                batch.append(("\n" if count == 0 else ",\n") + text)
+                count += 1
+                if len(batch) >= batch_size:
+                    await writer.write("".join(batch))
+                    batch = []
+                    # Give the gateway a turn between batches
+                    await asyncio.sleep(0)
+
+            batch.append("]" if count == 0 else "\n  ]")
+            await writer.write("".join(batch))
+            counts[name] = count
+
+        await writer.write("\n}")
+        await writer.flush()
+        await loop.run_in_executor(None, f.commit)
+        committed = True
+    finally:
+        if not committed:
+            # Nothing partial is left behind, and any earlier file is untouched
+            await asyncio.gather(writer.flush(), return_exceptions=True)
+            await loop.run_in_executor(None, f.abort)
+    return counts, writer.bytes_written
@@ -0,0 +1,222 @@
+"""Sharded bot setup, per-shard job workers and a multi-process launcher.
+
+    python -m blackup.sharding main.py --shards 16 --processes 4
+
+starts four copies of the bot, each connecting shards 0-3, 4-7 and so on.
+"""
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from discord.ext import commands
+
+# "auto" or a shard count; unset keeps the single-connection bot
+SHARD_COUNT_ENV = "BLACKUP_SHARD_COUNT"
+# Shards this process connects, e.g. "0-3" or "0,2,4"
+SHARD_IDS_ENV = "BLACKUP_SHARD_IDS"
+# Added to the dashboard and metrics ports so processes on one host don't collide
+PORT_OFFSET_ENV = "BLACKUP_PORT_OFFSET"
+# How many processes share the bot token, and so Discord's global rate limit
+PROCESS_COUNT_ENV = "BLACKUP_PROCESS_COUNT"
+
+
+def shard_for(guild_id, shard_count):
+    """The shard Discord routes a guild's events to"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def parse_shard_ids(text):
+    ids = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            ids.extend(range(int(first), int(last) + 1))
+        else:
+            ids.append(int(part))
+    return sorted(set(ids))
+
+
+def shard_options(environ=None):
+    """AutoShardedBot arguments from the environment, or None when not sharding"""
+    environ = os.environ if environ is None else environ
+    count = environ.get(SHARD_COUNT_ENV, "").strip()
+    if not count:
+        return None
+    options = {}
+    if count != "auto":
+        options["shard_count"] = int(count)
+    ids = environ.get(SHARD_IDS_ENV, "").strip()
+    if ids:
+        if "shard_count" not in options:
+            raise ValueError(f"{SHARD_IDS_ENV} needs an explicit {SHARD_COUNT_ENV}")
+        options["shard_ids"] = parse_shard_ids(ids)
+        if options["shard_ids"][-1] >= options["shard_count"]:
+            raise ValueError(f"{SHARD_IDS_ENV} goes past shard {options['shard_count'] - 1}")
+    return options
+
+
+def create_bot(intents, command_prefix='!', environ=None, **kwargs):
+    """commands.Bot, or commands.AutoShardedBot when sharding is configured"""
+    options = shard_options(environ)
+    if options is None:
+        return commands.Bot(command_prefix=command_prefix, intents=intents, **kwargs)
+    return commands.AutoShardedBot(command_prefix=command_prefix, intents=intents, **options, **kwargs)
+
+
+def port_offset(environ=None):
+    environ = os.environ if environ is None else environ
+    return int(environ.get(PORT_OFFSET_ENV, 0))
+
+
+def process_count(environ=None):
+    environ = os.environ if environ is None else environ
+    return max(1, int(environ.get(PROCESS_COUNT_ENV, 1)))
+
+
+class ShardWorkers:
+    """Backup and restore jobs, run against the shard that owns the guild.
+
+    There's no fixed pool: every job runs as soon as its shard is connected,
+    so a long restore never holds up other guilds, and the governor's
+    per-guild fair queuing decides who gets the API budget. A job whose
+    shard is disconnected waits for it to come back instead of failing
+    half way.
+    """
+
+    def __init__(self, bot, poll_interval=1.0):
+        self.bot = bot
+        self.poll_interval = poll_interval
+        self.jobs = {}
+        # Running jobs; kept so they aren't garbage collected
+        self.tasks = set()
+
+    @property
+    def sharded(self):
+        return isinstance(self.bot, commands.AutoShardedBot)
+
+    def shard_id(self, guild_id):
+        count = self.bot.shard_count
+        return shard_for(guild_id, count) if count else 0
+
+    def owns(self, guild_id):
+        """Whether this process connects the guild's shard"""
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        return shard_ids is None or self.shard_id(guild_id) in shard_ids
+
+    def connected(self, shard_id):
+        if self.sharded:
+            shard = self.bot.get_shard(shard_id)
+            return shard is not None and not shard.is_closed()
+        return self.bot.is_ready() and not self.bot.is_closed()
+
+    async def run(self, guild_id, job):
+        """Run ``job`` (a coroutine function) once the guild's shard is connected and return its result"""
+        shard_id = self.shard_id(guild_id)
+        task = asyncio.create_task(self._run(shard_id, job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        # A caller that stops waiting doesn't stop the job; half a restore is worse
+        return await asyncio.shield(task)
+
+    async def _run(self, shard_id, job):
+        jobs = self.jobs.setdefault(shard_id, Counter())
+        jobs["queued"] += 1
+        try:
+            while not self.connected(shard_id):
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            jobs["queued"] -= 1
+        jobs["running"] += 1
+        try:
+            result = await job()
+        except Exception:
+            jobs["failed"] += 1
+            raise
+        else:
+            jobs["completed"] += 1
+            return result
+        finally:
+            jobs["running"] -= 1
+
+    def health(self):
+        """Connection state, heartbeat latency, guilds and jobs for each local shard"""
+        guilds = Counter(guild.shard_id for guild in self.bot.guilds)
+        if self.sharded:
+            shards = [
+                (shard_id, info.latency, info.is_closed(), info.is_ws_ratelimited())
+                for shard_id, info in sorted(self.bot.shards.items())
+            ]
+        else:
+            shards = [(0, self.bot.latency, not self.connected(0), self.bot.is_ws_ratelimited())]
+
+        report = []
+        for shard_id, latency, closed, rate_limited in shards:
+            jobs = self.jobs.get(shard_id, Counter())
+            report.append({
+                "id": shard_id,
+                "status": "disconnected" if closed else "connected",
+                # Latency is NaN or inf until the first heartbeat is acknowledged
+                "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+                "rate_limited": rate_limited,
+                "guilds": guilds.get(shard_id, 0),
+                "queued": jobs["queued"],
+                "running": jobs["running"],
+                "completed": jobs["completed"],
+                "failed": jobs["failed"]
+            })
+        return report
+
+
+def shard_ranges(shard_count, processes):
+    """Split shards into contiguous, near-equal ranges, one per process"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
+def launch(script, shard_count, processes, python=sys.executable):
+    """Start one bot process per shard range; returns the Popen objects"""
+    procs = []
+    ranges = shard_ranges(shard_count, processes)
+    for index, shard_ids in enumerate(ranges):
+        env = dict(os.environ)
+        env[SHARD_COUNT_ENV] = str(shard_count)
+        env[SHARD_IDS_ENV] = f"{shard_ids.start}-{shard_ids.stop - 1}"
+        env[PORT_OFFSET_ENV] = str(index)
+        env[PROCESS_COUNT_ENV] = str(len(ranges))
+        procs.append(subprocess.Popen([python, script], env=env))
+    return procs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a bot script as several shard-range processes")
+    parser.add_argument("script", help="bot entry point, e.g. main.py")
+    parser.add_argument("--shards", type=int, required=True, help="total shard count")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    procs = launch(args.script, args.shards, args.processes)
+    try:
+        codes = [proc.wait() for proc in procs]
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+        codes = [proc.wait() for proc in procs]
+    return max(codes, default=0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from blackup.capture import SECTIONS
+from blackup.integrity import atomic_write, read_payload
+
+MANIFEST_FORMAT = "manifest"
+MANIFEST_VERSION = 1
+
+
+def record_hash(record):
+    """Content hash of a backup record, independent of key order"""
+    data = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest(), data
+
+
+class SnapshotStore:
+    """Content-addressed record store for one guild's backups.
+
+    Every role, category, channel and emoji record is written once under
+    ``objects/<hash[:2]>/<hash>.json``; a backup is then just a manifest of
+    hashes. Hashes already known to be on disk are remembered so repeated
+    snapshots don't stat every object again. ``lock`` is held while a
+    manifest is written, so garbage collection never sees its objects
+    without the manifest that refers to them.
+    """
+
+    def __init__(self, server_dir):
+        self.objects_dir = os.path.join(server_dir, "objects")
+        self.known = set()
+        self.lock = threading.Lock()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def put(self, record):
+        digest, data = record_hash(record)
+        if digest in self.known:
+            return digest, False
+
+        path = self.object_path(digest)
+        written = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The hash is the name, so a torn object would never be rewritten
+            atomic_write(path, data.encode("utf-8"), trailer=False)
+            written = True
+        self.known.add(digest)
+        return digest, written
+
+    def get(self, digest):
+        with open(self.object_path(digest), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_manifest(self, filename, backup_data):
+        """Store backup_data's records and write its manifest. Returns new object count."""
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "server_info": backup_data["server_info"]
+        }
+        new_objects = 0
+        with self.lock:
+            for section in SECTIONS:
+                hashes = []
+                for record in backup_data[section]:
+                    digest, written = self.put(record)
+                    hashes.append(digest)
+                    new_objects += written
+                manifest[section] = hashes
+
+            data = json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            atomic_write(filename, data)
+        return new_objects
+
+    def resolve(self, manifest):
+        """Expand a manifest back into a full backup dict"""
+        backup_data = {"server_info": manifest["server_info"]}
+        cache = {}
+        for section in SECTIONS:
+            records = []
+            for digest in manifest.get(section, []):
+                if digest not in cache:
+                    cache[digest] = self.get(digest)
+                records.append(cache[digest])
+            backup_data[section] = records
+        return backup_data
+
+    def clear(self):
+        """Remove every stored object for this guild"""
+        with self.lock:
+            shutil.rmtree(self.objects_dir, ignore_errors=True)
+            self.known.clear()
+
+
+_stores = {}
+
+
+def get_store(server_dir):
+    """Return the long-lived store for a guild's backup directory"""
+    if server_dir not in _stores:
+        _stores[server_dir] = SnapshotStore(server_dir)
+    return _stores[server_dir]
+
+
+def is_manifest(data):
+    return isinstance(data, dict) and data.get("format") == MANIFEST_FORMAT
+
+
+def read_backup_json(path, verified=False):
+    """Parse a JSON backup or manifest after checking its trailer"""
+    return json.loads(read_payload(path, verified))
+
+
+def load_backup(path, verified=False):
+    """Load a backup file, resolving snapshot manifests transparently"""
+    data = read_backup_json(path, verified)
+    if is_manifest(data):
+        return get_store(os.path.dirname(path)).resolve(data)
+    return data
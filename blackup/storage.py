@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+
+from blackup.catalog import BackupCatalog, NameCache, get_catalog, get_name_cache
+from blackup.formats import backup_extension, list_backup_files
+from blackup.members import member_snapshot_path
+from blackup.snapshots import get_store
+
+BACKUP_ROOT = "backups"
+
+
+class LocalStorage:
+    """Where backups live: one directory per guild under ``root``.
+
+    Owns the path layout, the catalog indexing it and the schedule and
+    retention files beside it, so nothing else builds paths itself. The
+    default root shares the bots' catalog; any other root (a benchmark's
+    temp dir, a mounted archive) gets a catalog of its own.
+    """
+
+    def __init__(self, root=BACKUP_ROOT, catalog=None):
+        self.root = root
+        self.shared = catalog is None and root == BACKUP_ROOT
+        if catalog is None:
+            catalog = get_catalog() if self.shared else BackupCatalog(os.path.join(root, "catalog.db"))
+        self.catalog = catalog
+        self._names = None
+
+    @property
+    def names(self):
+        """Autocomplete name cache over this storage's catalog"""
+        if self._names is None:
+            self._names = get_name_cache() if self.shared else NameCache(self.catalog)
+        return self._names
+
+    @property
+    def schedules_file(self):
+        return os.path.join(self.root, "schedules.json")
+
+    @property
+    def retention_file(self):
+        return os.path.join(self.root, "retention.json")
+
+    def server_dir(self, guild_id):
+        return f"{self.root}/{guild_id}"
+
+    def path(self, guild_id, filename):
+        return os.path.join(self.server_dir(guild_id), filename)
+
+    def exists(self, guild_id, filename):
+        return os.path.exists(self.path(guild_id, filename))
+
+    def has_guild(self, guild_id):
+        return os.path.exists(self.server_dir(guild_id))
+
+    def list(self, guild_id):
+        """Backup filenames in a guild's directory, in no particular order"""
+        return list_backup_files(self.server_dir(guild_id))
+
+    def new_path(self, guild, backup_name=None, backup_format="json"):
+        # Server name and timestamp keep names readable and unique
+        server_dir = self.server_dir(guild.id)
+        os.makedirs(server_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        prefix = f"{backup_name}_" if backup_name else ""
+        return f"{server_dir}/{prefix}{guild.name}_{stamp}{backup_extension(backup_format)}"
+
+    def delete_all(self, guild_id):
+        """Delete every backup for a guild; returns how many files were removed"""
+        server_dir = self.server_dir(guild_id)
+        deleted = 0
+        for filename in self.list(guild_id):
+            path = os.path.join(server_dir, filename)
+            os.remove(path)
+            deleted += 1
+            if os.path.exists(member_snapshot_path(path)):
+                os.remove(member_snapshot_path(path))
+
+        # Snapshot objects are only referenced by the manifests just deleted
+        get_store(server_dir).clear()
+        self.catalog.remove_guild(guild_id)
+        return deleted
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage()
+    return _storage
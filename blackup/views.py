@@ -0,0 +1,67 @@
+import discord
+
+from blackup.catalog import get_catalog
+
+PAGE_SIZE = 10
+
+
+def backup_list_embed(guild_id, page, catalog=None):
+    catalog = catalog or get_catalog()
+    total = catalog.count(guild_id)
+    pages = max(1, -(-total // PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+
+    embed = discord.Embed(
+        title="📋 Available Backups",
+        description=f"Found {total} backup file(s)",
+        color=discord.Color.blue()
+    )
+
+    for entry in catalog.list(guild_id, limit=PAGE_SIZE, offset=page * PAGE_SIZE):
+        embed.add_field(
+            name=f"📄 {entry.filename}",
+            value=f"Size: {entry.size:,} bytes • {entry.channels} channels • <t:{int(entry.created_at)}:R>",
+            inline=False
+        )
+
+    embed.set_footer(text=f"Page {page + 1} of {pages}")
+    return embed, page, pages
+
+
+class BackupListView(discord.ui.View):
+    """Previous/next buttons for paging through /list-backups"""
+
+    def __init__(self, guild_id, page=0, pages=1, catalog=None):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.catalog = catalog
+        self.page = page
+        self.pages = pages
+        self.message = None
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def _show(self, interaction, page):
+        embed, self.page, self.pages = backup_list_embed(self.guild_id, page, self.catalog)
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Previous", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass